@@ -0,0 +1,6 @@
+"""
+Packaged version of the Amazon reviews pipeline from data_cleaning.ipynb and
+final_analysis.ipynb. Run modules from the FinalProject directory, e.g.
+
+    python3 -m reviews.ingest <reviews.json> data/
+"""
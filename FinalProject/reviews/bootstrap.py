@@ -0,0 +1,171 @@
+"""
+Bootstrap confidence intervals for the mean delta_rating of every subgroup.
+
+final_analysis.ipynb builds review_grouped_barplot_ci.png from a t-interval
+per first_rating group, which assumes a roughly normal mean; delta_rating is
+bounded and piles up at 0, so intervals for the small 1-3 star groups are
+unreliable. This module resamples instead:
+  - values are sorted by group once; a block of resamples is a single
+    (resamples x N) index matrix where column j draws uniformly from the
+    slice of j's own group, so every group keeps its size (stratified
+    bootstrap) and all group means come from one np.add.reduceat
+  - blocks run on a process pool; each block gets its own child of one
+    np.random.SeedSequence, so results depend on the seed only, not on the
+    number of workers
+  - percentile and BCa intervals are returned per group (BCa acceleration
+    uses the closed-form jackknife of the mean)
+
+Usage (from FinalProject/):
+    python3 -m reviews.bootstrap store/ --resamples 10000 [--early 30 --late 60-90] [--workers N] [--seed 0]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
+import polars as pl
+
+# cap each block's index matrix at about 64 MB of int64
+BLOCK_CELLS = 8_000_000
+
+_values = _offsets = _sizes = _column_group = None
+
+
+def _init_worker(values: np.ndarray, offsets: np.ndarray, sizes: np.ndarray) -> None:
+    global _values, _offsets, _sizes, _column_group
+    _values, _offsets, _sizes = values, offsets, sizes
+    _column_group = np.repeat(np.arange(len(sizes)), sizes)
+
+
+def _resample_block(n_resamples: int, seed: np.random.SeedSequence) -> np.ndarray:
+    """(n_resamples, groups) matrix of resampled group means."""
+    rng = np.random.default_rng(seed)
+    col_size = _sizes[_column_group]
+    idx = _offsets[_column_group] + rng.integers(0, col_size, size=(n_resamples, len(_values)))
+    return np.add.reduceat(_values[idx], _offsets, axis=1) / _sizes
+
+
+def bootstrap_means(values: np.ndarray, groups: np.ndarray, n_resamples: int = 10_000,
+                    seed: int = 0, workers: int | None = None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Stratified bootstrap of per-group means.
+    Returns (group_labels, observed_means, boot) with boot of shape (n_resamples, groups).
+    """
+    order = np.argsort(groups, kind="stable")
+    values = np.asarray(values, dtype=np.float64)[order]
+    labels, offsets, sizes = np.unique(groups[order], return_index=True, return_counts=True)
+    observed = np.add.reduceat(values, offsets) / sizes
+
+    block = max(1, BLOCK_CELLS // max(len(values), 1))
+    counts = [min(block, n_resamples - i) for i in range(0, n_resamples, block)]
+    seeds = np.random.SeedSequence(seed).spawn(len(counts))
+
+    if workers == 1 or len(counts) == 1:
+        _init_worker(values, offsets, sizes)
+        blocks = [_resample_block(c, s) for c, s in zip(counts, seeds)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(values, offsets, sizes)) as pool:
+            blocks = list(pool.map(_resample_block, counts, seeds))
+
+    return labels, observed, np.vstack(blocks)
+
+
+def _jackknife_acceleration(x: np.ndarray) -> float:
+    n = len(x)
+    if n < 3:
+        return 0.0
+    theta_i = (x.sum() - x) / (n - 1)   # leave-one-out means
+    d = theta_i.mean() - theta_i
+    denom = 6.0 * (d ** 2).sum() ** 1.5
+    return float((d ** 3).sum() / denom) if denom > 0 else 0.0
+
+
+def bca_interval(x: np.ndarray, boot: np.ndarray, observed: float, confidence: float) -> tuple[float, float]:
+    """
+    Bias-corrected and accelerated interval for the mean of x. Falls back to
+    the percentile interval when the bias correction is undefined (every
+    resample on one side of the observed mean, e.g. a constant group).
+    """
+    alpha = (1 - confidence) / 2
+    p_below = np.mean(boot < observed)
+    if p_below <= 0 or p_below >= 1:
+        return tuple(np.quantile(boot, [alpha, 1 - alpha]))
+
+    norm = NormalDist()
+    z0 = norm.inv_cdf(p_below)
+    a = _jackknife_acceleration(x)
+    qs = []
+    for z in (norm.inv_cdf(alpha), norm.inv_cdf(1 - alpha)):
+        qs.append(norm.cdf(z0 + (z0 + z) / (1 - a * (z0 + z))))
+    return tuple(np.quantile(boot, qs))
+
+
+def group_intervals(values: np.ndarray, groups: np.ndarray, n_resamples: int = 10_000,
+                    confidence: float = 0.95, seed: int = 0, workers: int | None = None) -> pl.DataFrame:
+    """One row per group: n, mean, bootstrap SE, percentile CI and BCa CI."""
+    values = np.asarray(values, dtype=np.float64)
+    groups = np.asarray(groups)
+    labels, observed, boot = bootstrap_means(values, groups, n_resamples, seed, workers)
+
+    alpha = (1 - confidence) / 2
+    pct = np.quantile(boot, [alpha, 1 - alpha], axis=0)
+
+    rows = []
+    for g, label in enumerate(labels):
+        x = values[groups == label]
+        bca_low, bca_high = bca_interval(x, boot[:, g], observed[g], confidence)
+        rows.append({
+            "group": label.item() if hasattr(label, "item") else label,
+            "n": len(x),
+            "mean_delta": float(observed[g]),
+            "boot_se": float(boot[:, g].std(ddof=1)) if n_resamples > 1 else None,
+            "ci_low": float(pct[0, g]),
+            "ci_high": float(pct[1, g]),
+            "bca_low": float(bca_low),
+            "bca_high": float(bca_high),
+        })
+    return pl.DataFrame(rows)
+
+
+def main():
+    from reviews.cohort import build_cohort, parse_late, scan_source, window_deltas
+
+    parser = argparse.ArgumentParser(prog="python3 -m reviews.bootstrap", description=__doc__.split("\n\n")[0])
+    parser.add_argument("source", help='review store directory or glob of parts ("data/subset_part_*.parquet")')
+    parser.add_argument("--early", type=int, default=30, help="early window end (days)")
+    parser.add_argument("--late", type=parse_late, default=(60, 90), help="late window START-END (days)")
+    parser.add_argument("--resamples", type=int, default=10_000)
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    args = parser.parse_args()
+
+    late_start, late_end = args.late
+    lf, id_col = scan_source(args.source)
+    try:
+        deltas = window_deltas(build_cohort(lf, id_col, max_age_days=late_end), args.early, late_start, late_end)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    t0 = time.perf_counter_ns()
+    ci = group_intervals(
+        deltas["delta_rating"].to_numpy(),
+        deltas["first_rating"].to_numpy(),
+        n_resamples=args.resamples,
+        confidence=args.confidence,
+        seed=args.seed,
+        workers=args.workers,
+    ).rename({"group": "first_rating"})
+    ms = (time.perf_counter_ns() - t0) / 1_000_000
+
+    print(ci)
+    print(f"Bootstrap Execution Time (ms): {ms:.2f} (resamples={args.resamples}, workers={args.workers or os.cpu_count()})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Early/late sentiment-delta cohorts for many window definitions at once.
+
+final_analysis.ipynb computes one definition (early <= 30 days, late 60-90)
+by joining first_review_dt back onto every review and pivoting. Here the
+per-reviewer work happens once:
+  - build_cohort() computes each reviewer's first-review time, first rating
+    and the account age (whole days since first review) of every review,
+    keeps only reviews inside max_age_days, and stores them as flat NumPy
+    arrays sorted by (reviewer, age) with a running sum of ratings
+  - any window [a, b] is then two searchsorted calls over all reviewers, and
+    the window's rating sum is a difference of the running sum, so each extra
+    (early, late) pair costs O(reviewers) instead of a full join + pivot
+
+Window semantics match the notebook: early = age <= early_end, late =
+late_start <= age <= late_end, reviewers need a review in both windows, and
+delta_rating = mean(late) - mean(early).
+
+Usage (from FinalProject/):
+    python3 -m reviews.cohort store/ --early 7 14 30 --late 45-90 60-90 75-90
+    python3 -m reviews.cohort "data/subset_part_*.parquet"
+"""
+import argparse
+import sys
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import polars as pl
+
+SECONDS_PER_DAY = 86_400
+RATINGS = (1, 2, 3, 4, 5)
+
+
+@dataclass
+class Cohort:
+    max_age_days: int
+    reviewer: np.ndarray        # (R,) reviewer key/ID, in reviewer-index order
+    first_rating: np.ndarray    # (R,) rating of each reviewer's first review
+    keys: np.ndarray            # (N,) reviewer_index * span + age, sorted
+    rating_cumsum: np.ndarray   # (N + 1,) running sum of ratings along keys
+
+    @property
+    def span(self) -> int:
+        return self.max_age_days + 2
+
+
+def scan_source(source: str) -> tuple[pl.LazyFrame, str]:
+    """A review store directory (reviews.store) or a glob of ingested parts."""
+    if source.endswith(".parquet"):
+        return pl.scan_parquet(source), "reviewerID"
+    from reviews.store import scan_reviews
+    return scan_reviews(source), "reviewer_key"
+
+
+def build_cohort(lf: pl.LazyFrame, id_col: str, max_age_days: int = 90) -> Cohort:
+    reviews = (
+        lf
+        .select([id_col, pl.col("unixReviewTime").cast(pl.Int64), pl.col("overall").cast(pl.UInt8)])
+        .sort([id_col, "unixReviewTime"])
+        .with_columns(
+            ((pl.col("unixReviewTime") - pl.col("unixReviewTime").min().over(id_col)) // SECONDS_PER_DAY)
+            .cast(pl.Int32)
+            .alias("account_age_days"),
+            pl.col("overall").first().over(id_col).alias("first_rating"),
+        )
+        .filter(pl.col("account_age_days") <= max_age_days)
+        # a single review can never sit in two disjoint windows
+        .filter(pl.len().over(id_col) > 1)
+        .select([id_col, "account_age_days", "overall", "first_rating"])
+        .collect()
+    )
+
+    ids = reviews[id_col].to_numpy()
+    age = reviews["account_age_days"].to_numpy().astype(np.int64)
+    rating = reviews["overall"].to_numpy()
+
+    is_start = np.r_[True, ids[1:] != ids[:-1]][:len(ids)]
+    starts = np.flatnonzero(is_start)
+    reviewer_index = np.cumsum(is_start) - 1
+
+    # rows are sorted by (id, time) so age is non-decreasing within a reviewer and keys are sorted
+    return Cohort(
+        max_age_days=max_age_days,
+        reviewer=ids[starts],
+        first_rating=reviews["first_rating"].to_numpy()[starts],
+        keys=reviewer_index * (max_age_days + 2) + age,
+        rating_cumsum=np.r_[0, np.cumsum(rating, dtype=np.int64)],
+    )
+
+
+class _WindowSums:
+    """Per-reviewer (count, rating sum) for age windows, memoised per window bound."""
+
+    def __init__(self, cohort: Cohort):
+        self.cohort = cohort
+        self.base = np.arange(len(cohort.reviewer), dtype=np.int64) * cohort.span
+        self.lo_cache: dict[int, np.ndarray] = {}
+        self.hi_cache: dict[int, np.ndarray] = {}
+
+    def lo(self, a: int) -> np.ndarray:
+        if a not in self.lo_cache:
+            self.lo_cache[a] = np.searchsorted(self.cohort.keys, self.base + a, side="left")
+        return self.lo_cache[a]
+
+    def hi(self, b: int) -> np.ndarray:
+        if b not in self.hi_cache:
+            self.hi_cache[b] = np.searchsorted(self.cohort.keys, self.base + b, side="right")
+        return self.hi_cache[b]
+
+    def __call__(self, a: int, b: int) -> tuple[np.ndarray, np.ndarray]:
+        lo, hi = self.lo(a), self.hi(b)
+        cs = self.cohort.rating_cumsum
+        return hi - lo, cs[hi] - cs[lo]
+
+
+def _check_window(cohort: Cohort, early_end: int, late_start: int, late_end: int) -> None:
+    if not 0 <= early_end < late_start <= late_end <= cohort.max_age_days:
+        raise ValueError(
+            f"window early<={early_end}, late {late_start}-{late_end} must satisfy "
+            f"0 <= early_end < late_start <= late_end <= {cohort.max_age_days}"
+        )
+
+
+def _deltas(sums: _WindowSums, early_end: int, late_start: int, late_end: int):
+    early_n, early_sum = sums(0, early_end)
+    late_n, late_sum = sums(late_start, late_end)
+    both = (early_n > 0) & (late_n > 0)
+    early = early_sum[both] / early_n[both]
+    late = late_sum[both] / late_n[both]
+    return both, early, late, late - early
+
+
+def window_deltas(cohort: Cohort, early_end: int = 30, late_start: int = 60, late_end: int = 90) -> pl.DataFrame:
+    """Per-reviewer early/late means and delta_rating for one window (the notebook's user_change)."""
+    _check_window(cohort, early_end, late_start, late_end)
+    both, early, late, delta = _deltas(_WindowSums(cohort), early_end, late_start, late_end)
+    return pl.DataFrame({
+        "reviewer": cohort.reviewer[both],
+        "first_rating": cohort.first_rating[both],
+        "early": early,
+        "late": late,
+        "delta_rating": delta,
+    })
+
+
+def evaluate_grid(cohort: Cohort, windows: list[tuple[int, int, int]]) -> pl.DataFrame:
+    """
+    Summary rows for every (early_end, late_start, late_end) window: one row
+    for all reviewers (first_rating null) plus one per first-rating group.
+    """
+    for w in windows:
+        _check_window(cohort, *w)
+
+    sums = _WindowSums(cohort)
+    groups = np.array(RATINGS)
+    rows = []
+    for early_end, late_start, late_end in windows:
+        both, early, late, delta = _deltas(sums, early_end, late_start, late_end)
+        first = cohort.first_rating[both].astype(np.int64)
+
+        # per-group sums in one bincount each; index 0 is unused (ratings are 1..5)
+        n = np.bincount(first, minlength=6)
+        stats = {
+            "mean_early": np.bincount(first, weights=early, minlength=6),
+            "mean_late": np.bincount(first, weights=late, minlength=6),
+            "mean_delta": np.bincount(first, weights=delta, minlength=6),
+            "pct_improve": np.bincount(first, weights=delta > 0, minlength=6),
+            "pct_decline": np.bincount(first, weights=delta < 0, minlength=6),
+            "pct_no_change": np.bincount(first, weights=delta == 0, minlength=6),
+        }
+
+        window = {"early_end": early_end, "late_start": late_start, "late_end": late_end}
+        total = int(n.sum())
+        rows.append({
+            **window, "first_rating": None, "n": total,
+            **{k: (v.sum() / total if total else None) for k, v in stats.items()},
+            "median_delta": float(np.median(delta)) if total else None,
+        })
+        for g in groups:
+            if n[g] == 0:
+                continue
+            rows.append({
+                **window, "first_rating": int(g), "n": int(n[g]),
+                **{k: v[g] / n[g] for k, v in stats.items()},
+                "median_delta": float(np.median(delta[first == g])),
+            })
+
+    return pl.DataFrame(rows, schema={
+        "early_end": pl.Int32, "late_start": pl.Int32, "late_end": pl.Int32, "first_rating": pl.Int8,
+        "n": pl.Int64, "mean_early": pl.Float64, "mean_late": pl.Float64, "mean_delta": pl.Float64,
+        "pct_improve": pl.Float64, "pct_decline": pl.Float64, "pct_no_change": pl.Float64,
+        "median_delta": pl.Float64,
+    })
+
+
+def parse_late(value: str) -> tuple[int, int]:
+    start, sep, end = value.partition("-")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"late window must look like 60-90, got {value!r}")
+    return int(start), int(end)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python3 -m reviews.cohort", description=__doc__.split("\n\n")[0])
+    parser.add_argument("source", help='review store directory or glob of parts ("data/subset_part_*.parquet")')
+    parser.add_argument("--early", type=int, nargs="+", default=[30], help="early window ends (days)")
+    parser.add_argument("--late", type=parse_late, nargs="+", default=[(60, 90)], help="late windows as START-END (days)")
+    parser.add_argument("--out", help="optional CSV for the full grid")
+    args = parser.parse_args()
+
+    windows = [(e, ls, le) for e in args.early for ls, le in args.late]
+    max_age = max(le for _, _, le in windows)
+
+    t0 = time.perf_counter_ns()
+    lf, id_col = scan_source(args.source)
+    cohort = build_cohort(lf, id_col, max_age_days=max_age)
+    t1 = time.perf_counter_ns()
+    try:
+        grid = evaluate_grid(cohort, windows)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    t2 = time.perf_counter_ns()
+
+    with pl.Config(tbl_rows=-1):
+        print(grid)
+    print(f"Cohort build time (ms): {(t1 - t0) / 1_000_000:.2f} (reviewers={len(cohort.reviewer)})")
+    print(f"Grid evaluation time (ms): {(t2 - t1) / 1_000_000:.2f} (windows={len(windows)})")
+
+    if args.out:
+        grid.write_csv(args.out)
+        print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
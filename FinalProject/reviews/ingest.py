@@ -0,0 +1,362 @@
+"""
+Parallel ingestion of the Amazon reviews JSON-lines file into Parquet parts.
+
+Replaces the single-threaded loop in data_cleaning.ipynb:
+  - the file is split into newline-aligned byte ranges (default 512 MB each)
+    and a process pool ingests the ranges independently
+  - lines are decoded with orjson when it is installed (json otherwise)
+  - user sampling uses zlib.crc32 instead of hashlib.md5; it is still a stable
+    per-user hash, but it selects a *different* 1/USER_MOD sample than the
+    notebook did, so do not mix parts from the two ingestions
+  - rows are accumulated per column and written straight to Arrow record
+    batches, one Parquet part per batch_rows kept rows
+  - every part is written atomically and followed by a durable per-range
+    checkpoint (byte offset, parts, rows kept, bad-JSON count), so --resume
+    continues each range from its last committed offset after a crash or a
+    session timeout
+
+The output schema matches the notebook's subset_part_*.parquet files, so
+final_analysis.ipynb reads them unchanged.
+
+Usage (from FinalProject/):
+    python3 -m reviews.ingest <reviews.json> <out_dir> [--workers N] [--year-min 2018] [--year-max 2021]
+    python3 -m reviews.ingest <reviews.json> <out_dir> --resume
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+try:
+    import orjson as _json
+except ImportError:  # stdlib fallback, roughly 3x slower per line
+    import json as _json
+
+READ_CHUNK_BYTES = 16 << 20
+MANIFEST_FILE = "_ingest_manifest.json"
+CHECKPOINT_DIR = "_checkpoints"
+
+SCHEMA = pa.schema([
+    ("reviewerID", pa.string()),
+    ("unixReviewTime", pa.int64()),
+    ("year", pa.int64()),
+    ("overall", pa.float64()),
+    ("asin", pa.string()),
+    ("verified", pa.bool_()),
+    ("summary", pa.string()),
+    ("reviewText", pa.string()),
+])
+
+
+@dataclass(frozen=True)
+class IngestConfig:
+    year_min: int = 2018
+    year_max: int = 2021
+    user_mod: int = 20        # keep about 1/user_mod of users
+    user_keep: int = 0
+    batch_rows: int = 200_000
+
+
+def split_ranges(path: str, range_bytes: int) -> list[tuple[int, int]]:
+    """
+    Cut the file into [start, end) byte ranges of about range_bytes whose
+    boundaries sit just after a newline, so every line belongs to exactly one range.
+    """
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, "rb") as f:
+        pos = range_bytes
+        while pos < size:
+            f.seek(pos)
+            f.readline()  # finish the line that straddles pos
+            aligned = f.tell()
+            if aligned >= size:
+                break
+            if aligned > bounds[-1]:
+                bounds.append(aligned)
+            pos = aligned + range_bytes
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def iter_lines(path: str, start: int, end: int):
+    """
+    Yield (line, end_offset) for the raw lines in [start, end), reading in large
+    blocks instead of line by line. end_offset is the byte just past the line's
+    newline, i.e. where a resumed run would continue from.
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        offset = start
+        remaining = end - start
+        tail = b""
+        while remaining > 0:
+            block = f.read(min(READ_CHUNK_BYTES, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            lines = (tail + block).split(b"\n")
+            tail = lines.pop()
+            for line in lines:
+                offset += len(line) + 1
+                yield line, offset
+        if tail:
+            yield tail, offset + len(tail)
+
+
+def fsync_path(path: Path) -> None:
+    """fsync a file or directory by path; on a directory this makes renames into it durable."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_json_atomic(path: Path, payload: dict) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(json.dumps(payload, indent=2).encode("utf-8"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    fsync_path(path.parent)
+
+
+def epoch_bounds(config: IngestConfig) -> tuple[int, int]:
+    """[lo, hi) unix-second bounds for year_min..year_max, so the per-row year filter is two int compares."""
+    lo = datetime(config.year_min, 1, 1, tzinfo=timezone.utc)
+    hi = datetime(config.year_max + 1, 1, 1, tzinfo=timezone.utc)
+    return int(lo.timestamp()), int(hi.timestamp())
+
+
+def to_record_batch(cols: dict[str, list]) -> pa.RecordBatch:
+    ts = pa.array(cols["unixReviewTime"], pa.int64())
+    year = pc.year(ts.cast(pa.timestamp("s", tz="UTC"))).cast(pa.int64())
+    return pa.RecordBatch.from_arrays(
+        [
+            pa.array(cols["reviewerID"], pa.string()),
+            ts,
+            year,
+            pa.array(cols["overall"], pa.float64()),
+            pa.array(cols["asin"], pa.string()),
+            pa.array(cols["verified"], pa.bool_()),
+            pa.array(cols["summary"], pa.string()),
+            pa.array(cols["reviewText"], pa.string()),
+        ],
+        schema=SCHEMA,
+    )
+
+
+def part_name(range_index: int, seq: int) -> str:
+    # range index + sequence within the range: deterministic, so a rerun of a
+    # range overwrites its own parts instead of colliding with other ranges
+    return f"subset_part_{range_index:04d}_{seq:04d}.parquet"
+
+
+def ingest_range(path: str, out_dir: str, checkpoint: dict, config: IngestConfig) -> dict:
+    """
+    Worker: ingest one byte range, resuming from checkpoint["offset"].
+
+    Every batch_rows kept rows become one Parquet part, written to a .tmp file
+    and renamed into place; only then is the range checkpoint advanced to the
+    byte offset just past the last line in that part. A crash at any point
+    loses at most the rows after the last committed part.
+    """
+    out = Path(out_dir)
+    ckpt_path = out / CHECKPOINT_DIR / f"range_{checkpoint['index']:04d}.json"
+    ckpt = dict(checkpoint)
+
+    lo, hi = epoch_bounds(config)
+    mod, keep = config.user_mod, config.user_keep
+    loads = _json.loads
+
+    names = ["reviewerID", "unixReviewTime", "overall", "asin", "verified", "summary", "reviewText"]
+    cols = {n: [] for n in names}
+    reviewer_ids, times, ratings = cols["reviewerID"], cols["unixReviewTime"], cols["overall"]
+    asins, verifieds, summaries, texts = cols["asin"], cols["verified"], cols["summary"], cols["reviewText"]
+
+    # counters since the last commit; folded into ckpt when a part is committed
+    kept = bad_json = lines = 0
+    offset = ckpt["offset"]
+
+    def commit(done: bool = False):
+        nonlocal kept, bad_json, lines
+        if reviewer_ids:
+            final = out / part_name(ckpt["index"], ckpt["parts"])
+            tmp = final.with_name(final.name + ".tmp")
+            pq.write_table(pa.Table.from_batches([to_record_batch(cols)]), tmp, compression="zstd")
+            # the part must be on disk before the checkpoint that points past its rows
+            fsync_path(tmp)
+            os.replace(tmp, final)
+            fsync_path(out)
+            ckpt["parts"] += 1
+            for v in cols.values():
+                v.clear()
+        ckpt.update(
+            offset=offset,
+            lines=ckpt["lines"] + lines,
+            kept_rows=ckpt["kept_rows"] + kept,
+            bad_json=ckpt["bad_json"] + bad_json,
+            done=done,
+        )
+        kept = bad_json = lines = 0
+        write_json_atomic(ckpt_path, ckpt)
+
+    for line, offset in iter_lines(path, ckpt["offset"], ckpt["end"]):
+        line = line.strip()
+        if not line:
+            continue
+        lines += 1
+
+        try:
+            r = loads(line)
+        except ValueError:
+            bad_json += 1
+            continue
+
+        reviewer_id = r.get("reviewerID")
+        unix_time = r.get("unixReviewTime")
+        rating = r.get("overall")
+        if reviewer_id is None or unix_time is None or rating is None:
+            continue
+
+        unix_time = int(unix_time)
+        if unix_time < lo or unix_time >= hi:
+            continue
+
+        # stable user sample
+        if mod > 1 and zlib.crc32(reviewer_id.encode("utf-8")) % mod != keep:
+            continue
+
+        verified = r.get("verified")
+        reviewer_ids.append(reviewer_id)
+        times.append(unix_time)
+        ratings.append(float(rating))
+        asins.append(r.get("asin"))
+        verifieds.append(bool(verified) if verified is not None else None)
+        summaries.append(r.get("summary"))
+        texts.append(r.get("reviewText"))
+        kept += 1
+
+        if len(reviewer_ids) >= config.batch_rows:
+            commit()
+
+    offset = ckpt["end"]
+    commit(done=True)
+    return ckpt
+
+
+def plan_ranges(json_path: str, out: Path, config: IngestConfig, range_bytes: int, resume: bool) -> list[dict]:
+    """
+    Return one checkpoint dict per byte range. A fresh run writes the manifest
+    (input, config, ranges); a resumed run reloads it plus every range checkpoint.
+    """
+    manifest_path = out / MANIFEST_FILE
+    settings = {"json_path": os.path.abspath(json_path), "size": os.path.getsize(json_path), "config": asdict(config)}
+
+    if manifest_path.exists() and not resume:
+        raise ValueError(f"{out} already holds an ingestion; pass --resume to continue it or pick a new out_dir")
+
+    if resume and manifest_path.exists():
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if {k: manifest[k] for k in settings} != settings:
+            raise ValueError("input file or ingestion parameters differ from the run being resumed")
+        for stale in out.glob("*.tmp"):
+            stale.unlink()
+    else:
+        manifest = {**settings, "ranges": split_ranges(json_path, range_bytes)}
+        (out / CHECKPOINT_DIR).mkdir(parents=True, exist_ok=True)
+        write_json_atomic(manifest_path, manifest)
+
+    checkpoints = []
+    for i, (start, end) in enumerate(manifest["ranges"]):
+        ckpt_path = out / CHECKPOINT_DIR / f"range_{i:04d}.json"
+        if ckpt_path.exists():
+            with open(ckpt_path, "r", encoding="utf-8") as f:
+                checkpoints.append(json.load(f))
+        else:
+            checkpoints.append({
+                "index": i, "start": start, "end": end, "offset": start,
+                "parts": 0, "lines": 0, "kept_rows": 0, "bad_json": 0, "done": False,
+            })
+    return checkpoints
+
+
+def ingest(json_path: str, out_dir: str, config: IngestConfig, workers: int | None = None,
+           range_bytes: int = 512 << 20, resume: bool = False) -> dict:
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+
+    checkpoints = plan_ranges(json_path, out, config, range_bytes, resume)
+    todo = [c for c in checkpoints if not c["done"]]
+    print(f"{len(checkpoints)} byte ranges, {len(checkpoints) - len(todo)} already complete "
+          f"(workers={workers or os.cpu_count()})")
+    for c in todo:
+        if c["offset"] > c["start"]:
+            print(f"Resuming range {c['index']} at byte {c['offset']:,} (parts={c['parts']}, kept_rows={c['kept_rows']:,})")
+
+    final = {c["index"]: c for c in checkpoints if c["done"]}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(ingest_range, json_path, str(out), c, config) for c in todo]
+        for fut in as_completed(futures):
+            ckpt = fut.result()
+            final[ckpt["index"]] = ckpt
+            print(f"Finished range {ckpt['index']} | parts={ckpt['parts']} | kept_rows={ckpt['kept_rows']:,} | bad_json={ckpt['bad_json']:,}")
+
+    totals = {"lines": 0, "kept_rows": 0, "bad_json": 0, "parts": 0}
+    for ckpt in final.values():
+        for k in totals:
+            totals[k] += ckpt[k]
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python3 -m reviews.ingest", description="Parallel NDJSON -> Parquet ingestion")
+    parser.add_argument("json_path")
+    parser.add_argument("out_dir")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--range-mb", type=int, default=512, help="approximate bytes per worker range")
+    parser.add_argument("--year-min", type=int, default=IngestConfig.year_min)
+    parser.add_argument("--year-max", type=int, default=IngestConfig.year_max)
+    parser.add_argument("--user-mod", type=int, default=IngestConfig.user_mod)
+    parser.add_argument("--user-keep", type=int, default=IngestConfig.user_keep)
+    parser.add_argument("--batch-rows", type=int, default=IngestConfig.batch_rows, help="rows per Parquet part")
+    parser.add_argument("--resume", action="store_true", help="continue the ingestion already in out_dir")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.json_path):
+        print(f"Error: input not found: {args.json_path}")
+        sys.exit(1)
+
+    config = IngestConfig(args.year_min, args.year_max, args.user_mod, args.user_keep, args.batch_rows)
+
+    t0 = time.perf_counter_ns()
+    try:
+        totals = ingest(args.json_path, args.out_dir, config, workers=args.workers,
+                        range_bytes=args.range_mb << 20, resume=args.resume)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    ms = (time.perf_counter_ns() - t0) / 1_000_000
+
+    print("Done.")
+    print("Total kept rows:", totals["kept_rows"])
+    print("Bad JSON lines skipped:", totals["bad_json"])
+    print("Output files:", totals["parts"])
+    print(f"Execution Time (ms): {ms:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Lexicon sentiment scores for review text, written as a narrow side table.
+
+FinalAnalysis.md measures sentiment only through the star rating. This stage
+scores the text kept by reviews.store (text/ side table) so text-based deltas
+can be computed the same way:
+  - each text file of the store is a task for a process pool; a worker
+    streams it in Arrow record batches
+  - tokenizing is done with Arrow compute kernels on the whole batch (lower,
+    strip non-letters, split on whitespace) instead of per-review Python
+  - the lexicon is held as Arrow SetLookupOptions (built once per worker and
+    reused for every batch) plus a NumPy weight array; pc.index_in maps every
+    token of the batch to its lexicon slot at once and np.bincount sums
+    weights per review
+  - negation: a lexicon word right after a negator ("not good", "never
+    worked", "don't recommend") counts with its weight flipped; negators
+    themselves never score, even if the lexicon file lists them
+  - output is <store>/text_scores/part-*.parquet with (review_key, text_score),
+    joinable to reviews.store.scan_reviews() on review_key
+
+text_score is the mean lexicon weight of the matched tokens (0.0 when no token
+matches), on the lexicon's own scale (-5..+5 for AFINN-style files).
+
+Usage (from FinalProject/):
+    python3 -m reviews.sentiment store/ [--lexicon AFINN-111.txt] [--column reviewText] [--workers N]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from reviews.store import TEXT_DIR
+
+SCORES_DIR = "text_scores"
+
+# Small AFINN-style fallback so the stage runs without external files; pass
+# --lexicon with a full word<TAB>weight file (e.g. AFINN-111) for real analyses.
+DEFAULT_LEXICON = {
+    "love": 3, "loved": 3, "loves": 3, "excellent": 3, "amazing": 4, "awesome": 4, "perfect": 3,
+    "great": 3, "best": 3, "fantastic": 4, "wonderful": 4, "happy": 3, "recommend": 2,
+    "recommended": 2, "good": 3, "nice": 3, "fine": 2, "works": 1, "worked": 1, "easy": 1,
+    "comfortable": 2, "pleased": 3, "satisfied": 2, "sturdy": 2, "beautiful": 3, "glad": 3,
+    "fun": 4, "favorite": 2, "quality": 1, "helpful": 2, "fast": 1, "worth": 2, "like": 2,
+    "liked": 2, "enjoy": 2, "enjoyed": 2, "cute": 2, "gorgeous": 3, "reliable": 2,
+    "bad": -3, "poor": -2, "poorly": -2, "terrible": -3, "awful": -3, "horrible": -3,
+    "worst": -3, "hate": -3, "hated": -3, "broken": -1, "broke": -1, "useless": -2,
+    "waste": -1, "disappointed": -2, "disappointing": -2, "disappointment": -2, "junk": -3,
+    "cheap": -1, "defective": -2, "return": -1, "returned": -1, "refund": -1, "flimsy": -2,
+    "problem": -2, "problems": -2, "issue": -1, "issues": -1, "fail": -2, "failed": -2,
+    "stopped": -1, "wrong": -2, "unhappy": -2, "annoying": -2, "crap": -3, "fake": -3,
+    "mediocre": -1, "uncomfortable": -2, "avoid": -1, "scam": -2, "damaged": -3,
+}
+
+# flip the weight of the lexicon word that directly follows one of these
+NEGATORS = (
+    "not", "no", "never", "cannot", "don't", "doesn't", "didn't", "isn't", "wasn't",
+    "won't", "can't", "couldn't", "wouldn't", "shouldn't", "aren't", "weren't",
+)
+
+# per-worker state, set by _init_worker
+_lookup = _weights = _negators = None
+
+
+def load_lexicon(path: str | None) -> dict[str, float]:
+    """word<TAB>weight per line (AFINN format); None returns DEFAULT_LEXICON."""
+    if path is None:
+        return dict(DEFAULT_LEXICON)
+    lexicon = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            word, sep, weight = line.rstrip("\n").rpartition("\t")
+            if sep:
+                lexicon[word.lower()] = float(weight)
+    return lexicon
+
+
+def _init_worker(lexicon: dict[str, float]) -> None:
+    global _lookup, _weights, _negators
+    lexicon = {w: v for w, v in lexicon.items() if w not in NEGATORS}
+    _lookup = pc.SetLookupOptions(value_set=pa.array(list(lexicon.keys()), pa.string()))
+    _weights = np.array(list(lexicon.values()), dtype=np.float64)
+    _negators = pc.SetLookupOptions(value_set=pa.array(NEGATORS, pa.string()))
+
+
+def score_batch(batch: pa.RecordBatch, column: str) -> pa.RecordBatch:
+    text = pc.fill_null(batch.column(column), "")
+    tokens = pc.utf8_split_whitespace(pc.replace_substring_regex(pc.utf8_lower(text), r"[^a-z']+", " "))
+    flat = pc.list_flatten(tokens)
+    parents = pc.list_parent_indices(tokens)
+
+    slot = pc.index_in(flat, options=_lookup)
+    matched = pc.is_valid(slot).to_numpy(zero_copy_only=False)
+    parents = parents.to_numpy()
+
+    # a token is negated when the previous token of the same review is a negator
+    is_neg = pc.is_in(flat, options=_negators).to_numpy(zero_copy_only=False)
+    negated = np.zeros(len(is_neg), dtype=bool)
+    negated[1:] = is_neg[:-1] & (parents[1:] == parents[:-1])
+
+    weight = _weights[slot.to_numpy(zero_copy_only=False)[matched].astype(np.int64)]
+    weight[negated[matched]] *= -1
+    owner = parents[matched]
+
+    n = batch.num_rows
+    sums = np.bincount(owner, weights=weight, minlength=n)
+    counts = np.bincount(owner, minlength=n)
+    score = np.divide(sums, counts, out=np.zeros(n), where=counts > 0)
+
+    return pa.RecordBatch.from_arrays(
+        [batch.column("review_key"), pa.array(score.astype(np.float32))],
+        names=["review_key", "text_score"],
+    )
+
+
+def score_file(path: str, out_path: str, column: str, batch_rows: int) -> int:
+    """Worker: stream one text file of the store and write its scores. Returns rows scored."""
+    rows = 0
+    schema = pa.schema([("review_key", pa.uint32()), ("text_score", pa.float32())])
+    tmp = out_path + ".tmp"
+    with pq.ParquetWriter(tmp, schema, compression="zstd") as writer:
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_rows, columns=["review_key", column]):
+            writer.write_batch(score_batch(batch, column))
+            rows += batch.num_rows
+    os.replace(tmp, out_path)
+    return rows
+
+
+def score_store(store_dir: str, lexicon: dict[str, float], column: str = "reviewText",
+                workers: int | None = None, batch_rows: int = 64_000) -> int:
+    files = sorted(ds.dataset(Path(store_dir) / TEXT_DIR, format="parquet", partitioning="hive").files)
+    out = Path(store_dir) / SCORES_DIR
+    out.mkdir(parents=True, exist_ok=True)
+    for stale in out.glob("part-*.parquet"):
+        stale.unlink()
+
+    total = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(lexicon,)) as pool:
+        futures = [
+            pool.submit(score_file, f, str(out / f"part-{i:05d}.parquet"), column, batch_rows)
+            for i, f in enumerate(files)
+        ]
+        for fut in as_completed(futures):
+            total += fut.result()
+    print(f"Scored {total:,} reviews from {len(files)} files into {out}")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python3 -m reviews.sentiment", description=__doc__.split("\n\n")[0])
+    parser.add_argument("store_dir", help="review store built by reviews.store")
+    parser.add_argument("--lexicon", help="word<TAB>weight file (default: small built-in lexicon)")
+    parser.add_argument("--column", choices=["reviewText", "summary"], default="reviewText")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--batch-rows", type=int, default=64_000)
+    args = parser.parse_args()
+
+    if not (Path(args.store_dir) / TEXT_DIR).exists():
+        print(f"Error: no {TEXT_DIR}/ table in {args.store_dir} (run python3 -m reviews.store first)")
+        sys.exit(1)
+
+    t0 = time.perf_counter_ns()
+    score_store(args.store_dir, load_lexicon(args.lexicon), args.column, args.workers, args.batch_rows)
+    ms = (time.perf_counter_ns() - t0) / 1_000_000
+    print(f"Execution Time (ms): {ms:.2f}")
+
+
+if __name__ == "__main__":
+    main()
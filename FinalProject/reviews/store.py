@@ -0,0 +1,214 @@
+"""
+Compact the ingested subset_part_*.parquet files into a partitioned review store.
+
+Same idea as Week3/BuildUserLookup.py + FinalCompactEvents.py for r/place:
+  - reviewerID and asin are mapped to UInt32 keys through persisted lookup
+    tables (reviewer_lookup.parquet, asin_lookup.parquet). Existing keys are
+    kept on re-runs; new IDs are appended after the current max key.
+  - the narrow rating/time table is written as a hive-partitioned dataset
+    (reviews/year=YYYY/month=M/), sorted by reviewer_key then time inside
+    each partition, so filters on year/month prune whole directories and
+    per-reviewer scans read contiguous row groups
+  - summary and reviewText move to a side table (text/, same partitioning)
+    joined back via review_key when needed
+  - review_key is persisted the same way (review_lookup/, one file per year):
+    a review keeps its key on re-runs, so side tables keyed on it
+    (text_scores/ from reviews.sentiment) stay valid after recompacting
+
+Layout:
+    <store>/reviewer_lookup.parquet   reviewer_key (u32), reviewerID (str)
+    <store>/asin_lookup.parquet       asin_key (u32), asin (str)
+    <store>/reviews/year=/month=/     review_key (u32), reviewer_key (u32), asin_key (u32),
+                                      unixReviewTime (u32), overall (u8), verified (bool)
+    <store>/text/year=/month=/        review_key (u32), summary (str), reviewText (str)
+    <store>/review_lookup/year=YYYY.parquet
+                                      review_key (u32), reviewer_key, asin_key, unixReviewTime,
+                                      occurrence (u32: n-th identical review, in input order)
+
+Usage (from FinalProject/):
+    python3 -m reviews.store "data/subset_part_*.parquet" store/
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import polars as pl
+import pyarrow.dataset as ds
+
+REVIEWER_LOOKUP = "reviewer_lookup.parquet"
+ASIN_LOOKUP = "asin_lookup.parquet"
+REVIEWS_DIR = "reviews"
+TEXT_DIR = "text"
+REVIEW_LOOKUP_DIR = "review_lookup"
+# what identifies a review across re-runs
+REVIEW_ID_COLS = ["reviewer_key", "asin_key", "unixReviewTime", "occurrence"]
+
+U32_MAX = 2**32 - 1
+
+
+def build_lookup(parts: str, id_col: str, key_col: str, out_path: Path) -> pl.DataFrame:
+    """
+    Map every distinct id_col value to a UInt32 key. IDs already present in
+    out_path keep their key; new IDs are sorted and numbered after the max key.
+    """
+    ids = pl.scan_parquet(parts).select(id_col).drop_nulls().unique()
+
+    if out_path.exists():
+        existing = pl.read_parquet(out_path)
+        next_key = existing[key_col].max() + 1 if existing.height else 0
+        new = ids.join(existing.lazy(), on=id_col, how="anti")
+    else:
+        existing = None
+        next_key = 0
+        new = ids
+
+    new = (
+        new
+        .sort(id_col)
+        .with_row_index(key_col, offset=next_key)
+        .with_columns(pl.col(key_col).cast(pl.UInt32))
+        .select([key_col, id_col])
+        .collect()
+    )
+    lookup = new if existing is None else pl.concat([existing, new])
+    if lookup.height > U32_MAX:
+        raise ValueError(f"{id_col}: {lookup.height} distinct values do not fit a UInt32 key")
+
+    lookup.write_parquet(out_path, compression="zstd", compression_level=10)
+    print(f"Wrote {out_path} ({id_col}: {lookup.height} total, {new.height} new)")
+    return lookup
+
+
+def assign_review_keys(chunk: pl.DataFrame, lookup_path: Path, next_key: int) -> tuple[pl.DataFrame, int]:
+    """
+    Add review_key to one year's reviews. Reviews already in lookup_path keep
+    their key; new ones are numbered from next_key in chunk order. Returns
+    the chunk and the next free key.
+    """
+    ids = chunk.select(REVIEW_ID_COLS)
+    if lookup_path.exists():
+        existing = pl.read_parquet(lookup_path)
+        keyed = ids.join(existing, on=REVIEW_ID_COLS, how="left", nulls_equal=True, maintain_order="left")
+    else:
+        existing = None
+        keyed = ids.with_columns(pl.lit(None, dtype=pl.UInt32).alias("review_key"))
+
+    is_new = keyed["review_key"].is_null()
+    new_count = int(is_new.sum())
+    if next_key + new_count - 1 > U32_MAX:
+        raise ValueError("more reviews than fit a UInt32 review_key")
+    keyed = keyed.with_columns(
+        pl.coalesce(
+            pl.col("review_key").cast(pl.Int64),
+            pl.col("review_key").is_null().cast(pl.Int64).cum_sum() - 1 + next_key,
+        ).cast(pl.UInt32).alias("review_key")
+    )
+
+    new = keyed.filter(is_new).select(["review_key", *REVIEW_ID_COLS])
+    lookup = new if existing is None else pl.concat([existing, new])
+    lookup_path.parent.mkdir(parents=True, exist_ok=True)
+    lookup.write_parquet(lookup_path, compression="zstd")
+    return chunk.with_columns(keyed["review_key"]), next_key + new_count
+
+
+def write_partitioned(df: pl.DataFrame, base_dir: Path, basename: str) -> None:
+    ds.write_dataset(
+        df.to_arrow(),
+        base_dir,
+        format="parquet",
+        partitioning=["year", "month"],
+        partitioning_flavor="hive",
+        basename_template=basename + "-{i}.parquet",
+        existing_data_behavior="delete_matching",
+        file_options=ds.ParquetFileFormat().make_write_options(compression="zstd"),
+    )
+
+
+def compact(parts: str, store_dir: str) -> None:
+    store = Path(store_dir)
+    store.mkdir(parents=True, exist_ok=True)
+
+    reviewers = build_lookup(parts, "reviewerID", "reviewer_key", store / REVIEWER_LOOKUP)
+    asins = build_lookup(parts, "asin", "asin_key", store / ASIN_LOOKUP)
+
+    events = (
+        pl.scan_parquet(parts)
+        .with_columns(pl.from_epoch("unixReviewTime", time_unit="s").dt.month().cast(pl.Int8).alias("month"))
+        .join(reviewers.lazy(), on="reviewerID", how="inner")
+        .join(asins.lazy(), on="asin", how="left")
+    )
+
+    years = events.select(pl.col("year").unique().sort()).collect()["year"].to_list()
+
+    # review keys continue after the largest one handed out by any earlier run
+    lookups = sorted((store / REVIEW_LOOKUP_DIR).glob("year=*.parquet"))
+    max_key = pl.scan_parquet(lookups).select(pl.col("review_key").max()).collect().item() if lookups else None
+    next_key = 0 if max_key is None else max_key + 1
+
+    # one year at a time keeps memory bounded to a single year's slice
+    for year in years:
+        t0 = time.perf_counter_ns()
+        chunk = (
+            events
+            .filter(pl.col("year") == year)
+            .sort(["month", "reviewer_key", "unixReviewTime", "asin_key", "overall"], maintain_order=True)
+            .with_columns(
+                pl.col("unixReviewTime").cast(pl.UInt32),
+                pl.col("overall").cast(pl.UInt8),
+                pl.col("year").cast(pl.Int16),
+            )
+            .with_columns(
+                pl.int_range(pl.len(), dtype=pl.UInt32)
+                  .over(["reviewer_key", "asin_key", "unixReviewTime"])
+                  .alias("occurrence")
+            )
+            .collect()
+        )
+        chunk, next_key = assign_review_keys(chunk, store / REVIEW_LOOKUP_DIR / f"year={year}.parquet", next_key)
+
+        write_partitioned(
+            chunk.select(["review_key", "reviewer_key", "asin_key", "unixReviewTime", "overall", "verified", "year", "month"]),
+            store / REVIEWS_DIR,
+            f"reviews-{year}",
+        )
+        write_partitioned(
+            chunk.select(["review_key", "summary", "reviewText", "year", "month"]),
+            store / TEXT_DIR,
+            f"text-{year}",
+        )
+        ms = (time.perf_counter_ns() - t0) / 1_000_000
+        print(f"Wrote year={year}: {chunk.height:,} reviews ({ms:.2f} ms)")
+
+
+def scan_reviews(store_dir: str) -> pl.LazyFrame:
+    """
+    Lazy scan of the narrow review table. year/month come from the directory
+    names, so filtering on them skips whole partitions.
+    """
+    return pl.scan_parquet(f"{store_dir}/{REVIEWS_DIR}/**/*.parquet", hive_partitioning=True)
+
+
+def scan_text(store_dir: str) -> pl.LazyFrame:
+    """Lazy scan of the text side table (review_key, summary, reviewText)."""
+    return pl.scan_parquet(f"{store_dir}/{TEXT_DIR}/**/*.parquet", hive_partitioning=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python3 -m reviews.store", description=__doc__.split("\n\n")[0])
+    parser.add_argument("parts", help='glob of ingested parts, e.g. "data/subset_part_*.parquet"')
+    parser.add_argument("store_dir")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter_ns()
+    try:
+        compact(args.parts, args.store_dir)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    ms = (time.perf_counter_ns() - t0) / 1_000_000
+    print(f"Execution Time (ms): {ms:.2f}")
+
+
+if __name__ == "__main__":
+    main()
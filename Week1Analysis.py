@@ -1,9 +1,10 @@
 import sys
 import gzip
 import csv
-import time
 from datetime import datetime, timezone
 
+from rplace.profiling import stage
+
 # variables in '2022_place_canvas_history': timestamp, user_id, pixel_color, coordinate
 def parse_hour(date_str: str, hour_str: str) -> int:
     dt = datetime(
@@ -32,12 +33,7 @@ def parse_ts(ts: str) -> int:
     ).timestamp())
  
 
-def main():
-
-    path = sys.argv[1]
-    start_date, start_hour = sys.argv[2], sys.argv[3]
-    end_date, end_hour = sys.argv[4], sys.argv[5]
-
+def analyze(path: str, start_date: str, start_hour: str, end_date: str, end_hour: str) -> None:
     start_epoch = parse_hour(start_date, start_hour)
     end_epoch = parse_hour(end_date, end_hour)
     if end_epoch <= start_epoch:
@@ -50,46 +46,55 @@ def main():
     color_get = color_counts.get
     pixel_get = pixel_counts.get
 
-    t0 = time.perf_counter_ns()
+    with stage("week1.scan", engine="python") as rec:
+        with gzip.open(path, "rt", newline="") as f:
+            reader = csv.reader(f)
+            next(reader)  # skip header
 
-    with gzip.open(path, "rt", newline="") as f:
-        reader = csv.reader(f)
-        next(reader)  # skip header
+            for ts, _user_id, color, coord in reader:
+                ts_epoch = parse_ts(ts)
+                if ts_epoch < start_epoch:
+                    continue
+                if ts_epoch >= end_epoch:
+                    continue
 
-        for ts, _user_id, color, coord in reader:
-            ts_epoch = parse_ts(ts)
-            if ts_epoch < start_epoch:
-                continue
-            if ts_epoch >= end_epoch:
-                continue
+                # Count color
+                color_counts[color] = color_get(color, 0) + 1
 
-            # Count color
-            color_counts[color] = color_get(color, 0) + 1
+                coord = coord.strip().strip('"')
+                x_y = coord.split(",")
+                if len(x_y) != 2:
+                    continue
+                x_str, y_str = x_y
+                key = (x_str, y_str)
+                pixel_counts[key] = pixel_get(key, 0) + 1
 
-            coord = coord.strip().strip('"')
-            x_y = coord.split(",")
-            if len(x_y) != 2:
-                continue
-            x_str, y_str = x_y
-            key = (x_str, y_str)
-            pixel_counts[key] = pixel_get(key, 0) + 1
+            rec["rows_in"] = reader.line_num - 1
+        rec["rows_out"] = sum(color_counts.values())
 
-    if not color_counts:
-        print("No events found in the selected timeframe.")
-        return
+        if not color_counts:
+            print("No events found in the selected timeframe.")
+            return
 
 
-    # Find max color
-    most_color = max(color_counts.items(), key=lambda x: x[1])[0]
-    # Find max pixel
-    most_pixel = max(pixel_counts.items(), key=lambda x: x[1])[0]
+        # Find max color
+        most_color = max(color_counts.items(), key=lambda x: x[1])[0]
+        # Find max pixel
+        most_pixel = max(pixel_counts.items(), key=lambda x: x[1])[0]
 
-    t1 = time.perf_counter_ns()
-    ms = (t1 - t0) / 1_000_000
+    ms = rec["wall_ms"]
 
     print(f"Execution Time (ms): {ms:.2f}")
     print(f"Most Placed Color: {most_color}")
     print(f"Most Placed Pixel Location: ({most_pixel[0]}, {most_pixel[1]})")
 
+
+def main():
+    if len(sys.argv) != 6:
+        print("Usage: python3 Week1Analysis.py <file.csv.gzip> <start_YYYY-MM-DD> <start_HH> <end_YYYY-MM-DD> <end_HH>")
+        sys.exit(1)
+
+    analyze(*sys.argv[1:6])
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
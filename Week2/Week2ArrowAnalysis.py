@@ -0,0 +1,125 @@
+import sys
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+try:
+    from rplace.profiling import stage
+except ModuleNotFoundError:  # run directly from the week folder: plain timing, no traces
+    import time
+    from contextlib import contextmanager
+
+    @contextmanager
+    def stage(name, **fields):
+        rec = {"stage": name, **fields}
+        t0 = time.perf_counter_ns()
+        try:
+            yield rec
+        finally:
+            rec["wall_ms"] = (time.perf_counter_ns() - t0) / 1_000_000
+
+# coordinates "x,y" with x < X_LIMIT and y < Y_STRIDE (no leading zeros, so the key maps back to
+# the same string) are counted as x * Y_STRIDE + y in one NumPy array of at most X_LIMIT * Y_STRIDE;
+# anything else (moderation rectangles "x1,y1,x2,y2", odd values) is counted by string
+X_LIMIT = 2048
+Y_STRIDE = 2048
+BATCH_ROWS = 1 << 18
+
+
+def _add_counts(total: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    counts = np.bincount(keys)
+    if len(counts) > len(total):
+        total = np.pad(total, (0, len(counts) - len(total)))
+    total[:len(counts)] += counts
+    return total
+
+
+def analyze(path: str, start_date: str, start_hh: str, end_date: str, end_hh: str) -> None:
+    start_hour = f"{start_date} {start_hh}:00:00"
+    end_hour   = f"{end_date} {end_hh}:00:00"
+
+    with stage("week2.scan", engine="arrow") as rec:
+        # pixel_color read as dictionary (no string hashing), filter pushed into the scan:
+        # for a 19-char bound, ts >= bound / ts < bound on the full string is the same as on ts[:19]
+        fmt = ds.ParquetFileFormat(read_options=ds.ParquetReadOptions(dictionary_columns=["pixel_color"]))
+        dataset = ds.dataset(path, format=fmt)
+        window = (ds.field("timestamp") >= start_hour) & (ds.field("timestamp") < end_hour)
+
+        pool = pa.default_memory_pool()
+        color_counts: dict[str, int] = {}
+        pixel_counts = np.zeros(0, dtype=np.int64)
+        other_coords: dict[str, int] = {}
+        rows = 0
+
+        # readahead of one batch / one file: memory stays around one decoded row group
+        batches = dataset.to_batches(columns=["pixel_color", "coordinate"], filter=window, batch_size=BATCH_ROWS,
+                                     batch_readahead=1, fragment_readahead=1)
+        for batch in batches:
+            if batch.num_rows == 0:
+                continue
+            rows += batch.num_rows
+
+            # Most placed color: bincount over dictionary indices, then map the (<= 32) values
+            colors = batch.column("pixel_color")
+            if colors.null_count:
+                colors = colors.filter(colors.is_valid())
+            per_index = np.bincount(colors.indices.to_numpy(zero_copy_only=False), minlength=len(colors.dictionary))
+            for value, n in zip(colors.dictionary.to_pylist(), per_index.tolist()):
+                if n:
+                    color_counts[value] = color_counts.get(value, 0) + n
+
+            # Most placed coordinate: parse "x,y" with Arrow kernels, count keys with bincount
+            coord = batch.column("coordinate")
+            simple = pc.fill_null(pc.match_substring_regex(coord, r"^(0|[1-9]\d{0,4}),(0|[1-9]\d{0,3})$"), False)
+            xy = pc.split_pattern(pc.filter(coord, simple), ",")
+            x = pc.cast(pc.list_element(xy, 0), "int64").to_numpy()
+            y = pc.cast(pc.list_element(xy, 1), "int64").to_numpy()
+            in_stride = (x < X_LIMIT) & (y < Y_STRIDE)
+            pixel_counts = _add_counts(pixel_counts, x[in_stride] * Y_STRIDE + y[in_stride])
+
+            rest = [pc.filter(coord, pc.invert(simple))]
+            if not in_stride.all():
+                rest.append(pc.filter(pc.filter(coord, simple), pa.array(~in_stride)))
+            for part in rest:
+                for item in pc.value_counts(part.drop_null()).to_pylist():
+                    other_coords[item["values"]] = other_coords.get(item["values"], 0) + item["counts"]
+
+            # hand freed batch buffers back to the OS instead of letting the pool grow with the file
+            pool.release_unused()
+
+        rec["rows_out"] = rows
+
+        most_color = max(color_counts, key=color_counts.get) if color_counts else None
+        most_coord = None
+        if len(pixel_counts) and pixel_counts.max() > 0:
+            key = int(pixel_counts.argmax())
+            most_coord, best = f"{key // Y_STRIDE},{key % Y_STRIDE}", int(pixel_counts[key])
+            for value, n in other_coords.items():
+                if n > best:
+                    most_coord, best = value, n
+        elif other_coords:
+            most_coord = max(other_coords, key=other_coords.get)
+
+    ms = rec["wall_ms"]
+
+    if most_color is None or most_coord is None:
+        print("No events found in the selected timeframe.")
+        return
+
+    x, y = most_coord.split(",", 1)
+
+    print(f"Execution Time (ms): {ms:.2f}")
+    print(f"Most Placed Color: {most_color}")
+    print(f"Most Placed Pixel Location: ({x}, {y})")
+
+def main():
+    if len(sys.argv) != 6:
+        print("Usage: python3 Week2ArrowAnalysis.py <file.parquet> <start_YYYY-MM-DD> <start_HH> <end_YYYY-MM-DD> <end_HH>")
+        sys.exit(1)
+
+    analyze(*sys.argv[1:6])
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,29 @@
 import sys
-import time
+
 import duckdb
 
-def main():
-    path, start_date, start_hh, end_date, end_hh = sys.argv[1:6]
+try:
+    from rplace.profiling import duckdb_profile, stage
+except ModuleNotFoundError:  # run directly from the week folder: plain timing, no traces
+    import time
+    from contextlib import contextmanager
+
+    @contextmanager
+    def stage(name, **fields):
+        rec = {"stage": name, **fields}
+        t0 = time.perf_counter_ns()
+        try:
+            yield rec
+        finally:
+            rec["wall_ms"] = (time.perf_counter_ns() - t0) / 1_000_000
+
+    def duckdb_profile(con, query, name):
+        pass
+
+def analyze(path: str, start_date: str, start_hh: str, end_date: str, end_hh: str) -> None:
     start_hour = f"{start_date} {start_hh}:00:00"
     end_hour   = f"{end_date} {end_hh}:00:00"
 
-    t0 = time.perf_counter_ns()
-    con = duckdb.connect(database=":memory:")
-
     query = f"""
     WITH base AS (
         SELECT
@@ -43,11 +57,13 @@ def main():
         (SELECT coordinate  FROM pixel_top) AS most_coord;
     """
 
-    row = con.execute(query).fetchone()
-    most_color, most_coord = row if row is not None else (None, None)
+    with stage("week2.scan", engine="duckdb") as rec:
+        con = duckdb.connect(database=":memory:")
+        row = con.execute(query).fetchone()
+        most_color, most_coord = row if row is not None else (None, None)
+    ms = rec["wall_ms"]
 
-    t1 = time.perf_counter_ns()
-    ms = (t1 - t0) / 1_000_000
+    duckdb_profile(con, query, "week2.scan")
 
     if most_color is None or most_coord is None:
         print("No events found in the selected timeframe.")
@@ -58,5 +74,12 @@ def main():
     print(f"Most Placed Color: {most_color}")
     print(f"Most Placed Pixel Location: ({x}, {y})")
 
+def main():
+    if len(sys.argv) != 6:
+        print("Usage: python3 Week2DuckAnalysis.py <file.parquet> <start_YYYY-MM-DD> <start_HH> <end_YYYY-MM-DD> <end_HH>")
+        sys.exit(1)
+
+    analyze(*sys.argv[1:6])
+
 if __name__ == "__main__":
     main()
@@ -1,38 +1,47 @@
 import sys
-import time
-import pandas as pd
 
-def main():
-    if len(sys.argv) != 6:
-        print("Usage: python3 Week2PandasAnalysis.py <file.parquet> <start_YYYY-MM-DD> <start_HH> <end_YYYY-MM-DD> <end_HH>")
-        sys.exit(1)
+import pandas as pd
 
-    path, start_date, start_hh, end_date, end_hh = sys.argv[1:6]
+try:
+    from rplace.profiling import stage
+except ModuleNotFoundError:  # run directly from the week folder: plain timing, no traces
+    import time
+    from contextlib import contextmanager
+
+    @contextmanager
+    def stage(name, **fields):
+        rec = {"stage": name, **fields}
+        t0 = time.perf_counter_ns()
+        try:
+            yield rec
+        finally:
+            rec["wall_ms"] = (time.perf_counter_ns() - t0) / 1_000_000
+
+def analyze(path: str, start_date: str, start_hh: str, end_date: str, end_hh: str) -> None:
     start_hour = f"{start_date} {start_hh}:00:00"
     end_hour   = f"{end_date} {end_hh}:00:00"
 
-    t0 = time.perf_counter_ns()
-
-    # Load parquet (requires pyarrow installed)
-    df = pd.read_parquet(path, engine="pyarrow", columns=["timestamp", "pixel_color", "coordinate"])
+    with stage("week2.scan", engine="pandas") as rec:
+        # Load parquet (requires pyarrow installed)
+        df = pd.read_parquet(path, engine="pyarrow", columns=["timestamp", "pixel_color", "coordinate"])
 
-    # Match prior logic: compare timestamp string prefix (YYYY-MM-DD HH:MM:SS)
-    ts19 = df["timestamp"].astype(str).str.slice(0, 19)
-    mask = (ts19 >= start_hour) & (ts19 < end_hour)
-    sub = df.loc[mask, ["pixel_color", "coordinate"]]
+        # Match prior logic: compare timestamp string prefix (YYYY-MM-DD HH:MM:SS)
+        ts19 = df["timestamp"].astype(str).str.slice(0, 19)
+        mask = (ts19 >= start_hour) & (ts19 < end_hour)
+        sub = df.loc[mask, ["pixel_color", "coordinate"]]
+        rec["rows_in"], rec["rows_out"] = len(df), len(sub)
 
-    if sub.empty:
-        print("No events found in the selected timeframe.")
-        return
+        if sub.empty:
+            print("No events found in the selected timeframe.")
+            return
 
-    # Most placed color
-    most_color = sub["pixel_color"].value_counts().idxmax()
+        # Most placed color
+        most_color = sub["pixel_color"].value_counts().idxmax()
 
-    # Most placed coordinate
-    most_coord = sub["coordinate"].value_counts().idxmax()
+        # Most placed coordinate
+        most_coord = sub["coordinate"].value_counts().idxmax()
 
-    t1 = time.perf_counter_ns()
-    ms = (t1 - t0) / 1_000_000
+    ms = rec["wall_ms"]
 
     x, y = str(most_coord).split(",", 1)
 
@@ -40,5 +49,12 @@ def main():
     print(f"Most Placed Color: {most_color}")
     print(f"Most Placed Pixel Location: ({x}, {y})")
 
+def main():
+    if len(sys.argv) != 6:
+        print("Usage: python3 Week2PandasAnalysis.py <file.parquet> <start_YYYY-MM-DD> <start_HH> <end_YYYY-MM-DD> <end_HH>")
+        sys.exit(1)
+
+    analyze(*sys.argv[1:6])
+
 if __name__ == "__main__":
     main()
@@ -1,50 +1,61 @@
 import sys
-import time
+
 import polars as pl
 
-def main():
-    if len(sys.argv) != 6:
-        print("Usage: python3 Week2PolarsAnalysis.py <file.parquet> <start_YYYY-MM-DD> <start_HH> <end_YYYY-MM-DD> <end_HH>")
-        sys.exit(1)
+try:
+    from rplace.profiling import collect, stage
+except ModuleNotFoundError:  # run directly from the week folder: plain timing, no traces
+    import time
+    from contextlib import contextmanager
+
+    @contextmanager
+    def stage(name, **fields):
+        rec = {"stage": name, **fields}
+        t0 = time.perf_counter_ns()
+        try:
+            yield rec
+        finally:
+            rec["wall_ms"] = (time.perf_counter_ns() - t0) / 1_000_000
 
-    path, start_date, start_hh, end_date, end_hh = sys.argv[1:6]
+    def collect(lf, rec=None):
+        return lf.collect()
+
+def analyze(path: str, start_date: str, start_hh: str, end_date: str, end_hh: str) -> None:
     start_hour = f"{start_date} {start_hh}:00:00"
     end_hour   = f"{end_date} {end_hh}:00:00"
 
-    t0 = time.perf_counter_ns()
+    with stage("week2.scan", engine="polars") as rec:
+        # Lazy scan = doesn't load everything into memory at once
+        base = (
+            pl.scan_parquet(path)
+            .with_columns(
+                pl.col("timestamp").str.slice(0, 19).alias("ts19")
+            )
+            .filter(
+                (pl.col("ts19") >= start_hour) & (pl.col("ts19") < end_hour)
+            )
+            .select(["pixel_color", "coordinate"])
+        )
 
-    # Lazy scan = doesn't load everything into memory at once
-    base = (
-        pl.scan_parquet(path)
-        .with_columns(
-            pl.col("timestamp").str.slice(0, 19).alias("ts19")
+        # Most placed color
+        color_top = collect(
+            base.group_by("pixel_color")
+            .len()
+            .sort("len", descending=True)
+            .limit(1),
+            rec,
         )
-        .filter(
-            (pl.col("ts19") >= start_hour) & (pl.col("ts19") < end_hour)
+
+        # Most placed coordinate
+        pixel_top = collect(
+            base.group_by("coordinate")
+            .len()
+            .sort("len", descending=True)
+            .limit(1),
+            rec,
         )
-        .select(["pixel_color", "coordinate"])
-    )
-
-    # Most placed color
-    color_top = (
-        base.group_by("pixel_color")
-        .len()
-        .sort("len", descending=True)
-        .limit(1)
-        .collect()
-    )
-
-    # Most placed coordinate
-    pixel_top = (
-        base.group_by("coordinate")
-        .len()
-        .sort("len", descending=True)
-        .limit(1)
-        .collect()
-    )
-
-    t1 = time.perf_counter_ns()
-    ms = (t1 - t0) / 1_000_000
+
+    ms = rec["wall_ms"]
 
     if color_top.height == 0 or pixel_top.height == 0:
         print("No events found in the selected timeframe.")
@@ -60,5 +71,12 @@ def main():
     print(f"Most Placed Color: {most_color}")
     print(f"Most Placed Pixel Location: ({x}, {y})")
 
+def main():
+    if len(sys.argv) != 6:
+        print("Usage: python3 Week2PolarsAnalysis.py <file.parquet> <start_YYYY-MM-DD> <start_HH> <end_YYYY-MM-DD> <end_HH>")
+        sys.exit(1)
+
+    analyze(*sys.argv[1:6])
+
 if __name__ == "__main__":
     main()
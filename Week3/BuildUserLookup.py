@@ -1,26 +1,47 @@
 import sys
+
 import polars as pl
 
+try:
+    from rplace.profiling import stage
+except ModuleNotFoundError:  # run directly from the week folder: plain timing, no traces
+    import time
+    from contextlib import contextmanager
+
+    @contextmanager
+    def stage(name, **fields):
+        rec = {"stage": name, **fields}
+        t0 = time.perf_counter_ns()
+        try:
+            yield rec
+        finally:
+            rec["wall_ms"] = (time.perf_counter_ns() - t0) / 1_000_000
+
+def build_user_lookup(inp: str, out: str) -> None:
+    with stage("week3.user_lookup") as rec:
+        # Unique users (sort for stable IDs across runs)
+        users = (
+            pl.scan_parquet(inp)
+            .select("user_id")
+            .unique()
+            .sort("user_id")
+            .with_row_index("user_key")  # 0..n-1
+            .select(["user_key", "user_id"])
+            .collect()
+        )
+
+        rec["rows_out"] = users.height
+        users.write_parquet(out, compression="zstd", compression_level=10)
+        print(f"Wrote user lookup: {out} (users={users.height})")
+    print(f"Execution Time (ms): {rec['wall_ms']:.2f}")
+
 def main():
     if len(sys.argv) != 3:
         print("Usage: python3 Week3/BuildUserLookup.py <input_events.parquet> <output_user_lookup.parquet>")
         sys.exit(1)
 
     inp, out = sys.argv[1], sys.argv[2]
-
-    # Unique users (sort for stable IDs across runs)
-    users = (
-        pl.scan_parquet(inp)
-        .select("user_id")
-        .unique()
-        .sort("user_id")
-        .with_row_index("user_key")  # 0..n-1
-        .select(["user_key", "user_id"])
-        .collect()
-    )
-
-    users.write_parquet(out, compression="zstd", compression_level=10)
-    print(f"Wrote user lookup: {out} (users={users.height})")
+    build_user_lookup(inp, out)
 
 if __name__ == "__main__":
     main()
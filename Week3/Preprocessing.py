@@ -1,6 +1,22 @@
 import sys
+
 import polars as pl
 
+try:
+    from rplace.profiling import stage
+except ModuleNotFoundError:  # run directly from the week folder: plain timing, no traces
+    import time
+    from contextlib import contextmanager
+
+    @contextmanager
+    def stage(name, **fields):
+        rec = {"stage": name, **fields}
+        t0 = time.perf_counter_ns()
+        try:
+            yield rec
+        finally:
+            rec["wall_ms"] = (time.perf_counter_ns() - t0) / 1_000_000
+
 # this first helper only got file to 10 GB
 def conversion_helper(inp: str) -> pl.LazyFrame:
     """
@@ -49,55 +65,83 @@ def conversion_helper(inp: str) -> pl.LazyFrame:
         .select(["timestamp_ms", "user_id", "color_id", "x", "y"])
     )
 
-def main():
-    if len(sys.argv) not in (3, 4):
-        print("Usage: python3 Preprocessing.py <input.csv.gzip> <output_events.parquet> [output_user_lookup.parquet]")
-        sys.exit(1)
+def write_converted(inp: str, out: str) -> None:
+    """
+    Write the converted events (still keyed by user_id) to Parquet.
+    This is the TEST_OUTPUT.parquet consumed by BuildUserLookup.py and FinalCompactEvents.py.
+    """
+    with stage("week3.convert") as rec:
+        conversion_helper(inp).sink_parquet(out, compression="zstd", compression_level=10)
+        print(f"Wrote converted events: {out}")
+    print(f"Convert Execution Time (ms): {rec['wall_ms']:.2f}")
 
-    inp = sys.argv[1]
-    out_events = sys.argv[2]
-    out_lookup = sys.argv[3] if len(sys.argv) == 4 else None
-
-    # Phase 1: Build user lookup (user_id -> user_key)
-    base_for_users = conversion_helper(inp)
-
-    # Unique + sort for stable IDs (sorting costs time, but makes IDs deterministic)
-    user_lookup = (
-        base_for_users
-        .select("user_id")
-        .unique()
-        .sort("user_id")
-        .with_row_index("user_key")
-        .select(["user_key", "user_id"])
-        .collect()
-    )
 
-    print(f"Built user lookup (users={user_lookup.height})")
+def preprocess(inp: str, out_events: str, out_lookup: str | None = None, tiers: bool = True) -> None:
+    with stage("week3.preprocess") as rec:
+        # Phase 1: Build user lookup (user_id -> user_key)
+        base_for_users = conversion_helper(inp)
 
-    if out_lookup:
-        user_lookup.write_parquet(out_lookup, compression="zstd", compression_level=10)
-        print(f"Wrote user lookup: {out_lookup}")
+        # Unique + sort for stable IDs (sorting costs time, but makes IDs deterministic)
+        user_lookup = (
+            base_for_users
+            .select("user_id")
+            .unique()
+            .sort("user_id")
+            .with_row_index("user_key")
+            .select(["user_key", "user_id"])
+            .collect()
+        )
 
-    # Phase 2: Re-scan CSV and write final compact events with user_key
-    base = conversion_helper(inp)
+        print(f"Built user lookup (users={user_lookup.height})")
+        rec["users"] = user_lookup.height
 
-    # Compute t0 for offset-ms (keeps ms units but allows Int32 storage)
-    t0 = base.select(pl.col("timestamp_ms").min().alias("t0")).collect()["t0"][0]
-    print(f"Timestamp base t0 (ms): {t0}")
+        if out_lookup:
+            user_lookup.write_parquet(out_lookup, compression="zstd", compression_level=10)
+            print(f"Wrote user lookup: {out_lookup}")
 
-    users_lf = user_lookup.lazy()
+        # Phase 2: Re-scan CSV and write final compact events with user_key
+        base = conversion_helper(inp)
 
-    final_events = (
-        base.join(users_lf, on="user_id", how="inner")
-            .with_columns(
-                (pl.col("timestamp_ms") - pl.lit(t0)).cast(pl.Int32).alias("t_ms"),
-                pl.col("user_key").cast(pl.UInt32)
-            )
-            .select(["t_ms", "user_key", "color_id", "x", "y"])
-    )
+        # Compute t0 for offset-ms (keeps ms units but allows Int32 storage)
+        t0 = base.select(pl.col("timestamp_ms").min().alias("t0")).collect()["t0"][0]
+        print(f"Timestamp base t0 (ms): {t0}")
+
+        users_lf = user_lookup.lazy()
+
+        final_events = (
+            base.join(users_lf, on="user_id", how="inner")
+                .with_columns(
+                    (pl.col("timestamp_ms") - pl.lit(t0)).cast(pl.Int32).alias("t_ms"),
+                    pl.col("user_key").cast(pl.UInt32)
+                )
+                .select(["t_ms", "user_key", "color_id", "x", "y"])
+        )
+
+        final_events.sink_parquet(out_events, compression="zstd", compression_level=10)
+        print(f"Wrote final compact events: {out_events}")
+    print(f"Preprocess Execution Time (ms): {rec['wall_ms']:.2f}")
+
+    # Phase 3: nested user-sample tiers next to the events, for rplace.approx
+    if tiers:
+        try:
+            from Week3.SampleTiers import default_manifest, write_sample_tiers
+        except ModuleNotFoundError:  # run directly from Week3/: SampleTiers needs rplace
+            print(f"Skipped sample tiers (run from the repo root: python3 -m rplace tiers {out_events})")
+            return
+        write_sample_tiers(out_events, default_manifest(out_events))
+
+
+def main():
+    argv = [a for a in sys.argv[1:] if a != "--no-tiers"]
+    if len(argv) not in (2, 3):
+        print("Usage: python3 Preprocessing.py <input.csv.gzip> <output_events.parquet> [output_user_lookup.parquet] [--no-tiers]")
+        sys.exit(1)
+
+    inp = argv[0]
+    out_events = argv[1]
+    out_lookup = argv[2] if len(argv) == 3 else None
 
-    final_events.sink_parquet(out_events, compression="zstd", compression_level=10)
-    print(f"Wrote final compact events: {out_events}")
+    preprocess(inp, out_events, out_lookup, tiers="--no-tiers" not in sys.argv)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,81 @@
+import json
+import sys
+from pathlib import Path
+
+import polars as pl
+
+from rplace.hashing import BUCKETS, user_bucket
+from rplace.profiling import stage
+
+# nested user samples: every user in the 0.1% tier is also in the 1% and 10% tiers
+FRACTIONS = (0.001, 0.01, 0.1)
+
+
+def tier_path(manifest_path: str, events_path: str, fraction: float) -> Path:
+    return Path(manifest_path).parent / f"{Path(events_path).stem}.sample_{fraction * 100:g}pct.parquet"
+
+
+def default_manifest(events_path: str) -> str:
+    """events_compact.parquet -> events_compact.tiers.json next to it"""
+    p = Path(events_path)
+    return str(p.with_name(p.stem + ".tiers.json"))
+
+
+def write_sample_tiers(events_path: str, manifest_path: str, fractions: list[float] = FRACTIONS) -> list[str]:
+    """
+    Keep every event of a user when the user's stable hash bucket is below
+    fraction * BUCKETS (same idea as keep_user in data_cleaning.ipynb, but
+    nested, so each tier contains the smaller ones). A sampled user keeps all
+    their events, so per-user questions (sessions, first pixel, bot timing)
+    are exact for that user.
+    Tier files are named in the manifest relative to it; returns their paths.
+    """
+    with stage("week3.sample_tiers") as rec:
+        events = pl.scan_parquet(events_path)
+
+        # Hash each distinct user once instead of every event
+        users = events.select("user_key").unique().collect()
+        buckets = users.with_columns(
+            pl.Series("bucket", user_bucket(users["user_key"].to_numpy()))
+        )
+        print(f"Hashed {users.height} users into {BUCKETS} buckets")
+
+        tiers = []
+        for fraction in sorted(fractions):
+            keep = buckets.filter(pl.col("bucket") < int(fraction * BUCKETS)).select("user_key")
+            out = tier_path(manifest_path, events_path, fraction)
+            (
+                events
+                .join(keep.lazy(), on="user_key", how="semi")
+                .sink_parquet(out, compression="zstd", compression_level=10)
+            )
+            rows = pl.scan_parquet(out).select(pl.len()).collect().item()
+            tiers.append({"fraction": fraction, "path": out.name, "rows": rows, "users": keep.height})
+            print(f"Wrote tier {fraction * 100:g}%: {out} (users={keep.height}, rows={rows})")
+
+        manifest = {
+            "events_path": str(events_path),
+            "users": users.height,
+            "buckets": BUCKETS,
+            "tiers": tiers,
+        }
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        rec["rows_out"] = sum(t["rows"] for t in tiers)
+        print(f"Wrote tier manifest: {manifest_path}")
+    print(f"Execution Time (ms): {rec['wall_ms']:.2f}")
+    return [str(Path(manifest_path).parent / t["path"]) for t in tiers]
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python3 -m Week3.SampleTiers <events_compact.parquet> [tiers.json]   (from the repo root; needs rplace)")
+        sys.exit(1)
+
+    events_path = sys.argv[1]
+    manifest_path = sys.argv[2] if len(sys.argv) == 3 else default_manifest(events_path)
+    write_sample_tiers(events_path, manifest_path)
+
+
+if __name__ == "__main__":
+    main()
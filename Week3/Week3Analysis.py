@@ -1,8 +1,26 @@
 # Selected Timeframe: 2022-04-04 01 to 2022-04-04 07 
 import sys
-import time
+
 import polars as pl
 
+try:
+    from rplace.profiling import collect, stage
+except ModuleNotFoundError:  # run directly from the week folder: plain timing, no traces
+    import time
+    from contextlib import contextmanager
+
+    @contextmanager
+    def stage(name, **fields):
+        rec = {"stage": name, **fields}
+        t0 = time.perf_counter_ns()
+        try:
+            yield rec
+        finally:
+            rec["wall_ms"] = (time.perf_counter_ns() - t0) / 1_000_000
+
+    def collect(lf, rec=None):
+        return lf.collect()
+
 # using reddit, determined exact 32 colors
 COLOR_ID_TO_NAME = {
     0: "Black",
@@ -40,60 +58,33 @@ COLOR_ID_TO_NAME = {
 }
 
 
-def main():
-    if len(sys.argv) != 2:
-        print("Usage: python3 Week3Analysis.py <events_compact.parquet>")
-        sys.exit(1)
-
-    path = sys.argv[1]
-
-    # Since t_ms_min = 0 corresponds to 2022-04-04 00:00 UTC, this is 01:00–07:00
-    start_ts =  1 * 60 * 60 * 1000  # should be 3,600,000
-    end_ts   = 7 * 60 * 60 * 1000   # should be 25,200,000
-
-    t0 = time.perf_counter_ns()
-
-    events = pl.scan_parquet(path)
-
-    # Apply timeframe once and reuse it for all tasks
-    filtered = events.filter(
-        (pl.col("t_ms") >= start_ts) & (pl.col("t_ms") < end_ts)
-    )
- 
-    # Task 1: Rank colors by distinct users
+# Session = user's activity within 15 minutes of inactivity
+WINDOW_MS = 15 * 60 * 1000  # 900,000 ms
 
-    task1_start = time.perf_counter_ns()
 
-    colors_ranked = (
-        filtered
-        .group_by("color_id")
-        .agg(pl.col("user_key").n_unique().alias("distinct_users"))
-        .sort("distinct_users", descending=True)
-        .limit(10)
-        .collect()
+def top_colors(filtered: pl.LazyFrame, rec: dict | None = None, limit: int = 10) -> pl.DataFrame:
+    """Task 1: colors ranked by distinct users (color_name, distinct_users)."""
+    return (
+        collect(
+            filtered
+            .group_by("color_id")
+            .agg(pl.col("user_key").n_unique().alias("distinct_users"))
+            .sort("distinct_users", descending=True)
+            .limit(limit),
+            rec,
+        )
         .with_columns(
             pl.col("color_id")
-              .map_elements(lambda c: COLOR_ID_TO_NAME.get(c, f"Unknown({c})"))
+              .map_elements(lambda c: COLOR_ID_TO_NAME.get(c, f"Unknown({c})"), return_dtype=pl.Utf8)
               .alias("color_name")
         )
         .select(["color_name", "distinct_users"])
     )
 
-    task1_ms = (time.perf_counter_ns() - task1_start) / 1_000_000
-
-    print("\nTask 1: Distinct users per color (Top 10)")
-    for i, (color, users) in enumerate(colors_ranked.iter_rows(), start=1):
-        print(f"{i}. {color}: {users} users")
-    print(f"Task 1 Execution Time (ms): {task1_ms:.2f}")
-
-    # Task 2: Calculate Average Session Length
-    # Session = user's activity within 15 minutes of inactivity
-
-    task2_start = time.perf_counter_ns()
-
-    WINDOW_MS = 15 * 60 * 1000  # 900,000 ms
 
-    sessions = (
+def sessions(filtered: pl.LazyFrame) -> pl.LazyFrame:
+    """One row per (user_key, session_id) with start, end, event count and length."""
+    return (
         filtered
         .sort(["user_key", "t_ms"])
         .with_columns(pl.col("t_ms").shift(1).over("user_key").alias("prev_ts"))
@@ -113,67 +104,116 @@ def main():
         .with_columns((pl.col("session_end") - pl.col("session_start")).alias("session_length_ms"))
     )
 
-    avg_session = (
-        sessions
+
+def avg_session_length(filtered: pl.LazyFrame, rec: dict | None = None) -> float | None:
+    """Task 2: mean session length (ms) over sessions with more than one pixel; None if there are none."""
+    return collect(
+        sessions(filtered)
         .filter(pl.col("events_in_session") > 1)
-        .select(pl.col("session_length_ms").mean().alias("avg_session_length_ms"))
-        .collect()
+        .select(pl.col("session_length_ms").mean().alias("avg_session_length_ms")),
+        rec,
+    )[0, "avg_session_length_ms"]
+
+
+def pixel_percentiles(filtered: pl.LazyFrame, rec: dict | None = None,
+                      percentiles: tuple = (50, 75, 90, 99)) -> dict[int, int | None]:
+    """Task 3: percentiles of pixels placed per user."""
+    counts = collect(
+        filtered
+        .group_by("user_key")
+        .len()
+        .select(pl.col("len").alias("pixel_count")),
+        rec,
+    )
+    if rec is not None:
+        rec["rows_out"] = counts.height
+    return {p: counts["pixel_count"].quantile(p / 100, interpolation="nearest") for p in percentiles}
+
+
+def first_time_users(events: pl.LazyFrame, start_ts: int, end_ts: int, rec: dict | None = None) -> int:
+    """Task 4: users whose first pixel ever falls in [start_ts, end_ts)."""
+    return collect(
+        events
+        .group_by("user_key")
+        .agg(pl.col("t_ms").min().alias("first_t_ms"))
+        .filter((pl.col("first_t_ms") >= start_ts) & (pl.col("first_t_ms") < end_ts))
+        .select(pl.len().alias("first_time_users")),
+        rec,
+    )["first_time_users"][0]
+
+
+def analyze(path: str) -> None:
+    # Since t_ms_min = 0 corresponds to 2022-04-04 00:00 UTC, this is 01:00–07:00
+    start_ts =  1 * 60 * 60 * 1000  # should be 3,600,000
+    end_ts   = 7 * 60 * 60 * 1000   # should be 25,200,000
+
+    events = pl.scan_parquet(path)
+
+    # Apply timeframe once and reuse it for all tasks
+    filtered = events.filter(
+        (pl.col("t_ms") >= start_ts) & (pl.col("t_ms") < end_ts)
     )
+ 
+    # Task 1: Rank colors by distinct users
+
+    with stage("week3.task1") as rec:
+        colors_ranked = top_colors(filtered, rec)
+        rec["rows_out"] = colors_ranked.height
+
+    task1_ms = rec["wall_ms"]
+
+    print("\nTask 1: Distinct users per color (Top 10)")
+    for i, (color, users) in enumerate(colors_ranked.iter_rows(), start=1):
+        print(f"{i}. {color}: {users} users")
+    print(f"Task 1 Execution Time (ms): {task1_ms:.2f}")
 
-    task2_ms = (time.perf_counter_ns() - task2_start) / 1_000_000
-    avg_val = avg_session[0, "avg_session_length_ms"]
+    # Task 2: Calculate Average Session Length
+
+    with stage("week3.task2") as rec:
+        avg_val = avg_session_length(filtered, rec)
+
+    task2_ms = rec["wall_ms"]
 
     # only include times where more than one pixel was placed 
     if avg_val is None:
         print("\nTask 2: Average Session Length: N/A (no sessions with more than one pixel placement in this timeframe)")
     else:
         print(f"\nTask 2: Average Session Length: {avg_val:.2f} ms")
+    print(f"Task 2 Execution Time (ms): {task2_ms:.2f}")
 
     # Task 3: Pixel placement percentiles 
     # Calculate 50th, 75th, 90th, and 99th percentiles of pixels placed per user during timeframe
 
-    task3_start = time.perf_counter_ns()
-
-    counts = (
-        filtered
-        .group_by("user_key")
-        .len()
-        .select(pl.col("len").alias("pixel_count"))
-        .collect()
-    )
-
-    p50 = counts["pixel_count"].quantile(0.50, interpolation="nearest")
-    p75 = counts["pixel_count"].quantile(0.75, interpolation="nearest")
-    p90 = counts["pixel_count"].quantile(0.90, interpolation="nearest")
-    p99 = counts["pixel_count"].quantile(0.99, interpolation="nearest")
+    with stage("week3.task3") as rec:
+        pct = pixel_percentiles(filtered, rec)
 
-    task3_ms = (time.perf_counter_ns() - task3_start) / 1_000_000
+    task3_ms = rec["wall_ms"]
     print("\nTask 3: Percentiles of Pixels Placed")
-    print(f"50th percentile: {p50}")
-    print(f"75th percentile: {p75}")
-    print(f"90th percentile: {p90}")
-    print(f"99th percentile: {p99}")
+    for p, value in pct.items():
+        print(f"{p}th percentile: {value}")
     print(f"Task 3 Execution Time (ms): {task3_ms:.2f}")
 
-    total_ms = (time.perf_counter_ns() - t0) / 1_000_000
-    print(f"\nTotal Execution Time (ms): {total_ms:.2f}")
+    # Task 4: First-time users in timeframe
+    # Count how many users placed their first pixel ever within specified timeframe
+    with stage("week3.task4") as rec:
+        n_first = first_time_users(events, start_ts, end_ts, rec)
 
-# Task 4: First-time users in timeframe
-# Count how many users placed their first pixel ever within specified timeframe
-    task4_start = time.perf_counter_ns()
+    task4_ms = rec["wall_ms"]
+    print(f"\nTask 4: First-Time Users: {n_first} users")
+    print(f"Task 4 Execution Time (ms): {task4_ms:.2f}")
 
-    first_time_users = (
-        events
-        .group_by("user_key")
-        .agg(pl.col("t_ms").min().alias("first_t_ms"))
-        .filter((pl.col("first_t_ms") >= start_ts) & (pl.col("first_t_ms") < end_ts))
-        .select(pl.len().alias("first_time_users"))
-        .collect()
-    )["first_time_users"][0]
 
-    task4_ms = (time.perf_counter_ns() - task4_start) / 1_000_000
-    print(f"\nTask 4: First-Time Users: {first_time_users} users")
-    print(f"Task 4 Execution Time (ms): {task4_ms:.2f}")
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python3 Week3Analysis.py <events_compact.parquet>")
+        sys.exit(1)
+
+    path = sys.argv[1]
+
+    # total covers all four tasks (it used to be printed before Task 4 ran)
+    with stage("week3.total") as rec:
+        analyze(path)
+    print(f"\nTotal Execution Time (ms): {rec['wall_ms']:.2f}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,269 @@
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import polars as pl
+
+try:
+    from rplace.profiling import stage
+except ModuleNotFoundError:  # run directly from the week folder: plain timing, no traces
+    import time
+    from contextlib import contextmanager
+
+    @contextmanager
+    def stage(name, **fields):
+        rec = {"stage": name, **fields}
+        t0 = time.perf_counter_ns()
+        try:
+            yield rec
+        finally:
+            rec["wall_ms"] = (time.perf_counter_ns() - t0) / 1_000_000
+
+# small row groups, so reading one window's row range only decodes the groups it touches
+ROW_GROUP_ROWS = 16_384
+# canvas tiles for the per-window summaries (2000x2000 canvas -> 20x20 tiles)
+TILE_SIZE = 100
+
+
+def index_files(manifest_path: str) -> dict[str, Path]:
+    """burst_index.json -> the files written next to it"""
+    p = Path(manifest_path)
+    stem = p.stem
+    return {
+        "events": p.with_name(f"{stem}.events.parquet"),
+        "offsets": p.with_name(f"{stem}.offsets.parquet"),
+        "colors": p.with_name(f"{stem}.colors.parquet"),
+        "tiles": p.with_name(f"{stem}.tiles.parquet"),
+    }
+
+
+def build_burst_index(
+    events_path: str,
+    flagged: pl.DataFrame,
+    manifest_path: str,
+    time_granularity_sec: int = 1,
+) -> list[str]:
+    """
+    Index the events for burst drill-down.
+
+    flagged has one row per flagged window (t_bucket, users_in_window), as
+    found by detect_coordinated_bursts. Writes:
+      - a copy of the events sorted by t_ms (small row groups)
+      - bucket -> (offset, rows) into that copy, for every bucket, not only flagged ones
+      - per flagged window: events/users per color and per TILE_SIZE tile
+    The manifest names these files relative to itself. Returns their paths.
+    """
+    files = index_files(manifest_path)
+    bucket_ms = time_granularity_sec * 1000
+
+    with stage("week4.burst_index") as rec:
+        (
+            pl.scan_parquet(events_path)
+            .select(["t_ms", "user_key", "color_id", "x", "y"])
+            .sort("t_ms", maintain_order=True)
+            .sink_parquet(files["events"], compression="zstd", row_group_size=ROW_GROUP_ROWS)
+        )
+        events = pl.scan_parquet(files["events"]).with_columns((pl.col("t_ms") // bucket_ms).alias("t_bucket"))
+
+        # rows are time-sorted, so buckets are contiguous and in order
+        offsets = (
+            events
+            .group_by("t_bucket")
+            .agg(pl.len().alias("rows"))
+            .sort("t_bucket")
+            .with_columns((pl.col("rows").cum_sum() - pl.col("rows")).cast(pl.Int64).alias("offset"))
+            .select(["t_bucket", "offset", "rows"])
+            .collect()
+        )
+        offsets.write_parquet(files["offsets"])
+
+        in_flagged = events.join(flagged.lazy().select("t_bucket"), on="t_bucket", how="semi")
+        colors = (
+            in_flagged
+            .group_by(["t_bucket", "color_id"])
+            .agg(pl.len().alias("events"), pl.col("user_key").n_unique().alias("users"))
+            .sort(["t_bucket", "events"], descending=[False, True])
+            .collect()
+        )
+        colors.write_parquet(files["colors"])
+        tiles = (
+            in_flagged
+            .with_columns(
+                (pl.col("x") // TILE_SIZE).alias("tile_x"),
+                (pl.col("y") // TILE_SIZE).alias("tile_y"),
+            )
+            .group_by(["t_bucket", "tile_x", "tile_y"])
+            .agg(pl.len().alias("events"), pl.col("user_key").n_unique().alias("users"))
+            .sort(["t_bucket", "events"], descending=[False, True])
+            .collect()
+        )
+        tiles.write_parquet(files["tiles"])
+
+        manifest = {
+            "source": str(events_path),
+            "time_granularity_sec": time_granularity_sec,
+            "tile_size": TILE_SIZE,
+            "flagged": flagged.sort("t_bucket").select(["t_bucket", "users_in_window"]).rows(),
+            **{name: path.name for name, path in files.items()},
+        }
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        rec["rows_out"] = offsets["rows"].sum()
+        print(f"[Bucket 2] Wrote burst index: {manifest_path} "
+              f"({offsets.height} buckets, {flagged.height} flagged windows)")
+    return [str(path) for path in files.values()]
+
+
+class BurstIndex:
+    """Drill-down into flagged windows using a burst index; no scan of the full events file."""
+
+    def __init__(self, manifest_path: str, bots_csv: str | None = None):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.granularity = self.manifest["time_granularity_sec"]
+        self.tile_size = self.manifest["tile_size"]
+        # sidecar files are named relative to the manifest, so the index can be opened from any directory
+        base = Path(manifest_path).parent
+        self.events_path = base / self.manifest["events"]
+        self.flagged = dict(self.manifest["flagged"])     # t_bucket -> users_in_window
+
+        offsets = pl.read_parquet(base / self.manifest["offsets"])
+        self.offsets = dict(zip(offsets["t_bucket"].to_list(),
+                                zip(offsets["offset"].to_list(), offsets["rows"].to_list())))
+        self.colors = pl.read_parquet(base / self.manifest["colors"])
+        self.tiles = pl.read_parquet(base / self.manifest["tiles"])
+
+        # default: the bots CSV the pipeline / Week4 main writes next to the index
+        if bots_csv is None:
+            candidate = Path(manifest_path).with_name("suspected_bots.csv")
+            bots_csv = str(candidate) if candidate.exists() else None
+        self.bots = (
+            pl.read_csv(bots_csv, columns=["user_key"], schema_overrides={"user_key": pl.UInt32})["user_key"]
+            if bots_csv else pl.Series("user_key", [], dtype=pl.UInt32)
+        )
+
+    def windows(self) -> pl.DataFrame:
+        """Flagged windows as in coordinated_windows.csv (t_sec, users_in_window)."""
+        return pl.DataFrame(
+            {"t_sec": [b * self.granularity for b in self.flagged],
+             "users_in_window": list(self.flagged.values())},
+            schema={"t_sec": pl.Int64, "users_in_window": pl.UInt32},
+        ).sort("users_in_window", descending=True)
+
+    def events(self, t_sec: int) -> pl.DataFrame:
+        """All events of the window containing t_sec (any window, flagged or not)."""
+        offset, rows = self.offsets.get(t_sec // self.granularity, (0, 0))
+        return pl.scan_parquet(self.events_path).slice(offset, rows).collect()
+
+    def drill_down(self, t_sec: int) -> dict:
+        """Participating users, pixel footprint, color/tile summaries and bot overlap of one window."""
+        bucket = t_sec // self.granularity
+        events = self.events(t_sec)
+        users = events["user_key"].unique().sort()
+        footprint = (
+            events
+            .group_by(["x", "y"])
+            .agg(pl.len().alias("events"), pl.col("user_key").n_unique().alias("users"))
+            .sort(["events", "x", "y"], descending=[True, False, False])
+        )
+
+        if bucket in self.flagged:
+            colors = self.colors.filter(pl.col("t_bucket") == bucket).drop("t_bucket")
+            tiles = self.tiles.filter(pl.col("t_bucket") == bucket).drop("t_bucket")
+        else:
+            colors = (
+                events.group_by("color_id")
+                .agg(pl.len().alias("events"), pl.col("user_key").n_unique().alias("users"))
+                .sort("events", descending=True)
+            )
+            tiles = (
+                events
+                .with_columns((pl.col("x") // self.tile_size).alias("tile_x"),
+                              (pl.col("y") // self.tile_size).alias("tile_y"))
+                .group_by(["tile_x", "tile_y"])
+                .agg(pl.len().alias("events"), pl.col("user_key").n_unique().alias("users"))
+                .sort("events", descending=True)
+            )
+
+        bot_users = users.filter(users.is_in(self.bots.implode()))
+        bbox = (
+            (events["x"].min(), events["y"].min(), events["x"].max(), events["y"].max())
+            if events.height else None
+        )
+        return {
+            "t_sec": bucket * self.granularity,
+            "flagged": bucket in self.flagged,
+            "events": events.height,
+            "users_in_window": users.len(),
+            "user_keys": users,
+            "pixels": footprint,
+            "bbox": bbox,
+            "colors": colors,
+            "tiles": tiles,
+            "bot_users": bot_users,
+            "bot_share": bot_users.len() / users.len() if users.len() else 0.0,
+        }
+
+
+def summarize(index: BurstIndex, t_secs: list[int]) -> pl.DataFrame:
+    """One line per window: size, footprint, dominant color/tile and bot overlap."""
+    rows = []
+    for t_sec in t_secs:
+        d = index.drill_down(t_sec)
+        top_color = d["colors"]["color_id"][0] if d["colors"].height else None
+        top_tile = (d["tiles"]["tile_x"][0], d["tiles"]["tile_y"][0]) if d["tiles"].height else None
+        rows.append({
+            "t_sec": d["t_sec"],
+            "users": d["users_in_window"],
+            "events": d["events"],
+            "pixels": d["pixels"].height,
+            "bbox": str(d["bbox"]),
+            "top_color_id": top_color,
+            "top_tile": str(top_tile),
+            "bot_users": d["bot_users"].len(),
+        })
+    return pl.DataFrame(rows)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python3 BurstIndex.py",
+        description="Drill into coordinated windows using the index built by detect_coordinated_bursts.",
+    )
+    parser.add_argument("index", help="burst_index.json")
+    parser.add_argument("t_sec", type=int, nargs="*", help="windows to show in detail (default: summary of all flagged)")
+    parser.add_argument("--bots", help="suspected_bots.csv (default: next to the index, if present)")
+    parser.add_argument("--top", type=int, default=10, help="rows shown per table")
+    args = parser.parse_args(argv)
+
+    if not Path(args.index).exists():
+        print(f"Error: {args.index} not found")
+        sys.exit(1)
+
+    t0 = time.perf_counter_ns()
+    index = BurstIndex(args.index, args.bots)
+
+    if not args.t_sec:
+        summary = summarize(index, index.windows()["t_sec"].to_list())
+        with pl.Config(tbl_rows=args.top):
+            print(summary)
+        print(f"Windows: {summary.height}, with bot overlap: {summary.filter(pl.col('bot_users') > 0).height}")
+    for t_sec in args.t_sec:
+        d = index.drill_down(t_sec)
+        flag = "flagged" if d["flagged"] else "not flagged"
+        print(f"\nWindow t_sec={d['t_sec']} ({flag}): {d['events']} events, {d['users_in_window']} users, "
+              f"{d['pixels'].height} pixels, bbox {d['bbox']}")
+        print(f"Bot overlap: {d['bot_users'].len()} users ({d['bot_share']:.1%}): {d['bot_users'].to_list()[:args.top]}")
+        print(f"User keys: {d['user_keys'].to_list()[:args.top]}{' ...' if d['users_in_window'] > args.top else ''}")
+        print(d["colors"].head(args.top))
+        print(d["tiles"].head(args.top))
+        print(d["pixels"].head(args.top))
+
+    ms = (time.perf_counter_ns() - t0) / 1_000_000
+    print(f"Execution Time (ms): {ms:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,36 @@
+import sys
+
 import polars as pl
 
+try:
+    from rplace.profiling import collect, stage
+except ModuleNotFoundError:  # run directly from the week folder: plain timing, no traces
+    import time
+    from contextlib import contextmanager
+
+    @contextmanager
+    def stage(name, **fields):
+        rec = {"stage": name, **fields}
+        t0 = time.perf_counter_ns()
+        try:
+            yield rec
+        finally:
+            rec["wall_ms"] = (time.perf_counter_ns() - t0) / 1_000_000
+
+    def collect(lf, rec=None):
+        return lf.collect()
+
+try:
+    from Week4.BurstIndex import build_burst_index
+except ModuleNotFoundError:  # run directly from Week4/
+    from BurstIndex import build_burst_index
+
 # Bucket 1 helper: inter-event windows
 def compute_inter_event_windows(events_path: str) -> pl.LazyFrame:
-    events = pl.scan_parquet(events_path)
+    return inter_event_windows(pl.scan_parquet(events_path))
 
+
+def inter_event_windows(events: pl.LazyFrame) -> pl.LazyFrame:
     windows = (
         events
         .sort(["user_key", "t_ms"])
@@ -16,39 +43,18 @@ def compute_inter_event_windows(events_path: str) -> pl.LazyFrame:
     return windows
 
 
-# Bucket 1: Bot-like behavior
-def detect_bot_like_users(
-    events_path: str,
-    fast_ratio_threshold: float = 0.8,
-    min_total_events: int = 50,
-    percentile_for_fast: float = 0.01,
-    output_csv: str = "suspected_bots.csv",
-    print_top_n: int = 20,
-) -> None:
-    windows = compute_inter_event_windows(events_path)
-
-    # define "fast" relative to dataset
-    q = (
-        windows
-        .select([
-            pl.col("delta_ms").quantile(0.01).alias("p01"),
-            pl.col("delta_ms").quantile(0.05).alias("p05"),
-            pl.col("delta_ms").quantile(0.10).alias("p10"),
-            pl.col("delta_ms").median().alias("median"),
-        ])
-        .collect()
-    )
-    print("\n[Bucket 1] Inter-event timing quantiles (ms):")
-    print(q)
+def fast_threshold(windows: pl.LazyFrame, percentile_for_fast: float = 0.01) -> float | None:
+    """define "fast" relative to dataset: the given percentile of inter-event time (None if there are no gaps)"""
+    p = windows.select(pl.col("delta_ms").quantile(percentile_for_fast).alias("p")).collect()["p"][0]
+    return None if p is None else float(p)
 
-    fast_threshold_ms = float(
-        windows.select(pl.col("delta_ms").quantile(percentile_for_fast).alias("p")).collect()["p"][0]
-    )
-    print(
-        f"\n[Bucket 1] Using FAST_THRESHOLD_MS = p{int(percentile_for_fast*100):02d} "
-        f"= {fast_threshold_ms:.0f} ms ({fast_threshold_ms/1000:.2f} s)"
-    )
 
+def bot_like_users(
+    windows: pl.LazyFrame,
+    fast_threshold_ms: float,
+    fast_ratio_threshold: float = 0.8,
+    min_total_events: int = 50,
+) -> pl.LazyFrame:
     per_user_stats = (
         windows
         .group_by("user_key")
@@ -63,29 +69,69 @@ def detect_bot_like_users(
         )
     )
 
-    suspected_bots = (
+    return (
         per_user_stats
         .filter(
             (pl.col("fast_ratio") > fast_ratio_threshold) &
             (pl.col("total_events") > min_total_events)
         )
         .sort(["fast_ratio", "total_events"], descending=[True, True])
-        .collect()
     )
 
-    print(f"\n[Bucket 1] Suspected bots found: {suspected_bots.height}")
-    if suspected_bots.height > 0:
-        print(
-            suspected_bots.select(
-                ["user_key", "total_events", "fast_events", "fast_ratio", "median_delta_ms", "std_delta_ms"]
-            ).head(print_top_n)
-        )
-    else:
-        print("[Bucket 1] No users met the bot-like thresholds in this run.")
-
-    suspected_bots.write_csv(output_csv)
-    print(f"[Bucket 1] Wrote CSV: {output_csv}")
 
+# Bucket 1: Bot-like behavior
+def detect_bot_like_users(
+    events_path: str,
+    fast_ratio_threshold: float = 0.8,
+    min_total_events: int = 50,
+    percentile_for_fast: float = 0.01,
+    output_csv: str = "suspected_bots.csv",
+    print_top_n: int = 20,
+) -> None:
+    with stage("week4.bots") as rec:
+        windows = compute_inter_event_windows(events_path)
+
+        # define "fast" relative to dataset
+        q = (
+            windows
+            .select([
+                pl.col("delta_ms").quantile(0.01).alias("p01"),
+                pl.col("delta_ms").quantile(0.05).alias("p05"),
+                pl.col("delta_ms").quantile(0.10).alias("p10"),
+                pl.col("delta_ms").median().alias("median"),
+            ])
+            .collect()
+        )
+        print("\n[Bucket 1] Inter-event timing quantiles (ms):")
+        print(q)
+
+        fast_threshold_ms = fast_threshold(windows, percentile_for_fast)
+        if fast_threshold_ms is None:
+            # no user has two events: nothing to time, so write the CSV header only
+            print("\n[Bucket 1] No inter-event gaps (no user has more than one event)")
+            suspected_bots = bot_like_users(windows, 0, fast_ratio_threshold, min_total_events).clear().collect()
+        else:
+            print(
+                f"\n[Bucket 1] Using FAST_THRESHOLD_MS = p{int(percentile_for_fast*100):02d} "
+                f"= {fast_threshold_ms:.0f} ms ({fast_threshold_ms/1000:.2f} s)"
+            )
+            suspected_bots = bot_like_users(windows, fast_threshold_ms, fast_ratio_threshold, min_total_events)
+            suspected_bots = collect(suspected_bots, rec)
+        rec["rows_out"] = suspected_bots.height
+
+        print(f"\n[Bucket 1] Suspected bots found: {suspected_bots.height}")
+        if suspected_bots.height > 0:
+            print(
+                suspected_bots.select(
+                    ["user_key", "total_events", "fast_events", "fast_ratio", "median_delta_ms", "std_delta_ms"]
+                ).head(print_top_n)
+            )
+        else:
+            print("[Bucket 1] No users met the bot-like thresholds in this run.")
+
+        suspected_bots.write_csv(output_csv)
+        print(f"[Bucket 1] Wrote CSV: {output_csv}")
+    print(f"[Bucket 1] Execution Time (ms): {rec['wall_ms']:.2f}")
 
 
 # Bucket 2: Coordinated pixel placements
@@ -96,63 +142,77 @@ def detect_coordinated_bursts(
     percentile_threshold: float = 0.99,
     output_csv: str = "coordinated_windows.csv",
     print_top_n: int = 10,
-) -> None:
-    events = pl.scan_parquet(events_path)
-
-    # Group into fixed-length time windows (seconds since dataset start)
-    windows = (
-        events
-        .with_columns((pl.col("t_ms") // (time_granularity_sec * 1000)).alias("t_bucket"))
-        .group_by("t_bucket")
-        .agg(pl.col("user_key").n_unique().alias("users_in_window"))
-    )
-
-    stats = (
-        windows
-        .select([
-            pl.col("users_in_window").quantile(0.95).alias("p95"),
-            pl.col("users_in_window").quantile(0.99).alias("p99"),
-            pl.col("users_in_window").max().alias("max_users"),
-        ])
-        .collect()
-    )
-
-    print("\n[Bucket 2] Window user-count stats:")
-    print(stats)
-
-    p_thresh = (
-        windows
-        .select(pl.col("users_in_window").quantile(percentile_threshold).alias("p"))
-        .collect()
-    )["p"][0]
-    print(f"[Bucket 2] Using threshold = p{int(percentile_threshold*100):02d} = {p_thresh:.0f} users/window")
+    index_path: str | None = None,
+) -> list[str]:
+    with stage("week4.bursts") as rec:
+        events = pl.scan_parquet(events_path)
+
+        # Group into fixed-length time windows (seconds since dataset start)
+        windows = (
+            events
+            .with_columns((pl.col("t_ms") // (time_granularity_sec * 1000)).alias("t_bucket"))
+            .group_by("t_bucket")
+            .agg(pl.col("user_key").n_unique().alias("users_in_window"))
+        )
 
-    coordinated = (
-        windows
-        .filter(pl.col("users_in_window") > p_thresh)
-        .sort("users_in_window", descending=True)
-        .collect()
-    )
+        stats = (
+            windows
+            .select([
+                pl.col("users_in_window").quantile(0.95).alias("p95"),
+                pl.col("users_in_window").quantile(0.99).alias("p99"),
+                pl.col("users_in_window").max().alias("max_users"),
+            ])
+            .collect()
+        )
 
-    print(f"\n[Bucket 2] Coordinated windows found: {coordinated.height}")
-    if coordinated.height > 0:
-        print(coordinated.head(print_top_n))
-    else:
-        print("[Bucket 2] No windows exceeded the burst threshold in this run.")
-
-    # Convert bucket index back to seconds since start
-    coordinated = (
-        coordinated
-        .with_columns((pl.col("t_bucket") * time_granularity_sec).alias("t_sec"))
-        .select(["t_sec", "users_in_window"])
-    )
+        print("\n[Bucket 2] Window user-count stats:")
+        print(stats)
+
+        p_thresh = (
+            windows
+            .select(pl.col("users_in_window").quantile(percentile_threshold).alias("p"))
+            .collect()
+        )["p"][0]
+        print(f"[Bucket 2] Using threshold = p{int(percentile_threshold*100):02d} = {p_thresh:.0f} users/window")
+
+        coordinated = collect(
+            windows
+            .filter(pl.col("users_in_window") > p_thresh)
+            .sort("users_in_window", descending=True),
+            rec,
+        )
+        rec["rows_out"] = coordinated.height
+
+        print(f"\n[Bucket 2] Coordinated windows found: {coordinated.height}")
+        if coordinated.height > 0:
+            print(coordinated.head(print_top_n))
+        else:
+            print("[Bucket 2] No windows exceeded the burst threshold in this run.")
+
+        # Row offsets + color/tile summaries, so flagged windows can be drilled into without a rescan
+        index_files = []
+        if index_path is not None:
+            index_files = build_burst_index(events_path, coordinated, index_path, time_granularity_sec)
+
+        # Convert bucket index back to seconds since start
+        coordinated = (
+            coordinated
+            .with_columns((pl.col("t_bucket") * time_granularity_sec).alias("t_sec"))
+            .select(["t_sec", "users_in_window"])
+        )
 
-    coordinated.write_csv(output_csv)
-    print(f"[Bucket 2] Wrote CSV: {output_csv}")
+        coordinated.write_csv(output_csv)
+        print(f"[Bucket 2] Wrote CSV: {output_csv}")
+    print(f"[Bucket 2] Execution Time (ms): {rec['wall_ms']:.2f}")
+    return index_files
 
 
 def main():
-    EVENTS_PATH = "../events_compact.parquet"
+    if len(sys.argv) > 2:
+        print("Usage: python3 Week4Analysis.py [events_compact.parquet]")
+        sys.exit(1)
+
+    EVENTS_PATH = sys.argv[1] if len(sys.argv) == 2 else "../events_compact.parquet"
 
     # Run Bucket 1
     BOT_FAST_RATIO = 0.8
@@ -163,6 +223,7 @@ def main():
     BURST_WINDOW_SEC = 1
     BURST_PERCENTILE = 0.99
     BURSTS_OUT = "coordinated_windows.csv"
+    BURST_INDEX_OUT = "burst_index.json"
 
     # Run bucket 2
     detect_bot_like_users(
@@ -178,6 +239,7 @@ def main():
         time_granularity_sec=BURST_WINDOW_SEC,
         percentile_threshold=BURST_PERCENTILE,
         output_csv=BURSTS_OUT,
+        index_path=BURST_INDEX_OUT,
     )
 
 
@@ -0,0 +1,14 @@
+"""
+Shared tooling for the r/place Week3 -> Week4 -> Week5 chain.
+
+The per-week scripts stay runnable on their own; this package imports their
+stage functions (e.g. Week4.Week4Analysis.detect_bot_like_users), so the repo
+root has to be importable.
+"""
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
@@ -0,0 +1,3 @@
+from rplace.cli import main
+
+main()
@@ -0,0 +1,257 @@
+"""
+Approximate Week3/Week4 answers from the nested user-sample tiers.
+
+Week3/SampleTiers.py writes 0.1% / 1% / 10% user samples of events_compact.parquet
+(every event of a sampled user is kept). Each query here runs on one tier and
+returns scaled estimates with confidence bounds; with --target-error it starts
+on the smallest tier and moves up (finally to the full file, where bounds are
+exact) until every reported estimate is within the target relative error.
+
+Because sampling is per user (fraction p, stable hash), the estimators are:
+  - user counts (distinct users per color, first-time users, bot-like users,
+    users per burst window): n / p, SE = sqrt(n * (1 - p)) / p
+  - average session length: ratio of per-user sums, linearised variance over
+    sampled users with finite-population factor (1 - p)
+  - pixels-per-user percentiles: the sample quantile, bounds from the binomial
+    order-statistic interval (scaled by sqrt(1 - p)); a side whose rank falls
+    outside the sample is unbounded
+Below MIN_SAMPLE_USERS sampled users the session-length and percentile bounds
+are unbounded. All bounds shrink to zero width at p = 1.
+
+Queries: top_colors, session_length, percentiles, first_time_users, bots, bursts
+
+Usage (from the repo root):
+    python3 -m rplace.approx events_compact.parquet top_colors --target-error 0.05
+    python3 -m rplace.approx events_compact.parquet percentiles --tier 0.01 [--start-ms 3600000 --end-ms 25200000]
+"""
+import argparse
+import json
+import math
+import sys
+import time
+from pathlib import Path
+from statistics import NormalDist
+
+import numpy as np
+import polars as pl
+
+from rplace.profiling import stage
+from Week3 import Week3Analysis
+from Week3.SampleTiers import default_manifest
+from Week4 import Week4Analysis
+
+DEFAULT_START_MS = 1 * 60 * 60 * 1000
+DEFAULT_END_MS = 7 * 60 * 60 * 1000
+# below this many sampled users the normal-approximation bounds are not trusted:
+# the answer is reported with an unbounded interval so --target-error moves up a tier
+MIN_SAMPLE_USERS = 30
+
+
+def load_tiers(events_path: str, manifest_path: str | None = None) -> list[tuple[float, str]]:
+    """[(fraction, path), ...] smallest first, always ending with (1.0, events_path)."""
+    manifest_path = manifest_path or default_manifest(events_path)
+    if not Path(manifest_path).exists():
+        raise FileNotFoundError(f"no tier manifest {manifest_path} (run python3 -m rplace tiers first)")
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    base = Path(manifest_path).parent   # tier files are named relative to the manifest
+    tiers = sorted((t["fraction"], str(base / t["path"])) for t in manifest["tiers"])
+    return tiers + [(1.0, events_path)]
+
+
+def _count_bounds(df: pl.DataFrame, n_col: str, p: float, z: float) -> pl.DataFrame:
+    """
+    Scale a sampled user count column into estimate / low / high. A zero count
+    on a sample tier gets the upper bound z^2 / p, so it never reads as exact.
+    """
+    n = pl.col(n_col).cast(pl.Float64)
+    half = z * (n * (1 - p)).sqrt() / p
+    zero_high = z * z / p if p < 1 else 0.0
+    return df.with_columns(
+        (n / p).alias("estimate"),
+        pl.max_horizontal(n / p - half, n).alias("low"),
+        pl.when(n == 0).then(pl.lit(zero_high)).otherwise(n / p + half).alias("high"),
+    )
+
+
+# ---------- queries: (lf, p, start_ms, end_ms, z) -> DataFrame with estimate / low / high ----------
+
+def q_top_colors(lf, p, start_ms, end_ms, z):
+    filtered = lf.filter((pl.col("t_ms") >= start_ms) & (pl.col("t_ms") < end_ms))
+    df = (
+        filtered
+        .group_by("color_id")
+        .agg(pl.col("user_key").n_unique().alias("sampled_users"))
+        .sort("sampled_users", descending=True)
+        .limit(10)
+        .collect()
+    )
+    df = df.with_columns(
+        pl.col("color_id")
+          .map_elements(lambda c: Week3Analysis.COLOR_ID_TO_NAME.get(c, f"Unknown({c})"), return_dtype=pl.Utf8)
+          .alias("color_name")
+    )
+    return _count_bounds(df, "sampled_users", p, z).select(["color_name", "sampled_users", "estimate", "low", "high"])
+
+
+def q_session_length(lf, p, start_ms, end_ms, z):
+    filtered = lf.filter((pl.col("t_ms") >= start_ms) & (pl.col("t_ms") < end_ms))
+    per_user = (
+        Week3Analysis.sessions(filtered)
+        .filter(pl.col("events_in_session") > 1)
+        .group_by("user_key")
+        .agg(pl.col("session_length_ms").sum().alias("s"), pl.len().alias("n"))
+        .collect()
+    )
+    m = per_user.height
+    if m == 0:
+        return pl.DataFrame({"sampled_users": [0], "estimate": [None], "low": [None], "high": [None]},
+                            schema={"sampled_users": pl.Int64, "estimate": pl.Float64, "low": pl.Float64, "high": pl.Float64})
+    s = per_user["s"].to_numpy().astype(np.float64)
+    n = per_user["n"].to_numpy().astype(np.float64)
+    r = s.sum() / n.sum()
+    if p < 1 and m < MIN_SAMPLE_USERS:
+        return pl.DataFrame({"sampled_users": [m], "estimate": [r], "low": [0.0], "high": [math.inf]})
+    resid = s - r * n
+    var = (1 - p) * (m / (m - 1)) * (resid ** 2).sum() / n.sum() ** 2 if m > 1 else 0.0
+    half = z * math.sqrt(var)
+    return pl.DataFrame({"sampled_users": [m], "estimate": [r], "low": [r - half], "high": [r + half]})
+
+
+def q_percentiles(lf, p, start_ms, end_ms, z):
+    filtered = lf.filter((pl.col("t_ms") >= start_ms) & (pl.col("t_ms") < end_ms))
+    counts = np.sort(filtered.group_by("user_key").len().collect()["len"].to_numpy())
+    m = len(counts)
+    rows = []
+    for q in (0.50, 0.75, 0.90, 0.99):
+        if m == 0:
+            rows.append({"percentile": int(q * 100), "estimate": None, "low": None, "high": None})
+            continue
+        est = float(pl.Series(counts).quantile(q, interpolation="nearest"))
+        if p == 1:
+            rows.append({"percentile": int(q * 100), "estimate": est, "low": est, "high": est})
+            continue
+        # order-statistic ranks; a rank past either end of the sample leaves that side unbounded
+        spread = z * math.sqrt(m * q * (1 - q) * (1 - p))
+        lo_rank, hi_rank = math.floor(m * q - spread), math.ceil(m * q + spread)
+        lo = float(counts[lo_rank]) if lo_rank >= 0 else 0.0
+        hi = float(counts[hi_rank]) if hi_rank <= m - 1 else math.inf
+        if m < MIN_SAMPLE_USERS:
+            lo, hi = 0.0, math.inf
+        rows.append({"percentile": int(q * 100), "estimate": est, "low": float(min(lo, est)), "high": float(max(hi, est))})
+    return pl.DataFrame(rows, schema={"percentile": pl.Int32, "estimate": pl.Float64, "low": pl.Float64, "high": pl.Float64})
+
+
+def q_first_time_users(lf, p, start_ms, end_ms, z):
+    n = Week3Analysis.first_time_users(lf, start_ms, end_ms)
+    return _count_bounds(pl.DataFrame({"sampled_users": [n]}), "sampled_users", p, z)
+
+
+def q_bots(lf, p, start_ms, end_ms, z):
+    # bot timing is judged on a user's whole history, like Week4 (the window is not applied)
+    windows = Week4Analysis.inter_event_windows(lf)
+    threshold = Week4Analysis.fast_threshold(windows)
+    n = 0 if threshold is None else Week4Analysis.bot_like_users(windows, threshold).collect().height
+    return _count_bounds(pl.DataFrame({"sampled_users": [n]}), "sampled_users", p, z)
+
+
+def q_bursts(lf, p, start_ms, end_ms, z):
+    # users per 1-second window; the top 10 windows with scaled counts
+    windows = (
+        lf
+        .with_columns((pl.col("t_ms") // 1000).alias("t_sec"))
+        .group_by("t_sec")
+        .agg(pl.col("user_key").n_unique().alias("sampled_users"))
+        .sort(["sampled_users", "t_sec"], descending=[True, False])
+        .limit(10)
+        .collect()
+    )
+    return _count_bounds(windows, "sampled_users", p, z).select(["t_sec", "sampled_users", "estimate", "low", "high"])
+
+
+QUERIES = {
+    "top_colors": q_top_colors,
+    "session_length": q_session_length,
+    "percentiles": q_percentiles,
+    "first_time_users": q_first_time_users,
+    "bots": q_bots,
+    "bursts": q_bursts,
+}
+
+
+def relative_error(df: pl.DataFrame) -> float:
+    """Largest CI half-width / |estimate| over the rows; inf when nothing was observed."""
+    worst = 0.0
+    for est, lo, hi in df.select(["estimate", "low", "high"]).iter_rows():
+        if est is None:
+            return math.inf
+        half = (hi - lo) / 2
+        if half == 0:
+            continue
+        if est == 0:
+            return math.inf
+        worst = max(worst, half / abs(est))
+    return worst if df.height else math.inf
+
+
+def run_query(name: str, tiers: list[tuple[float, str]], start_ms: int = DEFAULT_START_MS,
+              end_ms: int = DEFAULT_END_MS, confidence: float = 0.95, target_error: float | None = None,
+              tier: float | None = None) -> tuple[pl.DataFrame, float, float]:
+    """
+    Run one query on one tier (tier=fraction) or escalate through the tiers
+    until relative_error <= target_error. Returns (result, fraction used, relative error).
+    """
+    func = QUERIES[name]
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    if tier is not None:
+        chosen = [t for t in tiers if math.isclose(t[0], tier)]
+        if not chosen:
+            raise ValueError(f"no tier {tier}; available: {', '.join(f'{f:g}' for f, _ in tiers)}")
+        candidates = chosen
+    else:
+        candidates = tiers if target_error is not None else tiers[:1]
+
+    for fraction, path in candidates:
+        with stage(f"approx.{name}", tier=fraction) as rec:
+            result = func(pl.scan_parquet(path), fraction, start_ms, end_ms, z)
+            err = relative_error(result)
+            rec["relative_error"] = err
+        print(f"[approx] {name} on {fraction * 100:g}% tier: relative error {err:.2%} ({rec['wall_ms']:.2f} ms)")
+        if target_error is None or err <= target_error:
+            break
+    return result, fraction, err
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python3 -m rplace.approx", description=__doc__.split("\n\n")[0])
+    parser.add_argument("events", help="events_compact.parquet (its tiers from Week3/SampleTiers.py)")
+    parser.add_argument("query", choices=sorted(QUERIES))
+    parser.add_argument("--tiers", help="tier manifest (default: <events stem>.tiers.json next to events)")
+    parser.add_argument("--tier", type=float, help="run on this fraction only (e.g. 0.01, or 1 for the full file)")
+    parser.add_argument("--target-error", type=float, help="escalate tiers until relative CI half-width <= this (e.g. 0.05)")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--start-ms", type=int, default=DEFAULT_START_MS)
+    parser.add_argument("--end-ms", type=int, default=DEFAULT_END_MS)
+    args = parser.parse_args(argv)
+
+    try:
+        tiers = load_tiers(args.events, args.tiers)
+        t0 = time.perf_counter_ns()
+        result, fraction, err = run_query(args.query, tiers, args.start_ms, args.end_ms, args.confidence,
+                                          args.target_error, args.tier)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    ms = (time.perf_counter_ns() - t0) / 1_000_000
+
+    with pl.Config(tbl_rows=-1):
+        print(result)
+    exact = " (exact)" if fraction == 1.0 else f", {args.confidence:.0%} bounds"
+    print(f"Tier: {fraction * 100:g}%{exact}; relative error {err:.2%}")
+    if args.target_error is not None and err > args.target_error:
+        print(f"Target error {args.target_error:.2%} not reached even on the full file")
+    print(f"Execution Time (ms): {ms:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""
+Single entry point for the r/place scripts:
+
+    python3 -m rplace <subcommand> [args...]
+
+Engine libraries (polars, duckdb, pandas, sklearn) are imported inside the
+subcommand that needs them, never at module top, so `--help`, argument
+errors and the pure-Python scan pay only interpreter + argparse startup.
+
+Warm-process modes, for scripting many timeframe queries:
+    python3 -m rplace --repeat 20 scan events.parquet 2022-04-04 01 2022-04-04 07
+    python3 -m rplace --batch < queries.txt      # one subcommand per line
+
+Per-stage traces (see rplace.profiling):
+    python3 -m rplace --trace run.jsonl [--profile] bots events.parquet
+"""
+import argparse
+import os
+import shlex
+import sys
+import time
+
+SCAN_ENGINES = ("python", "pandas", "polars", "duckdb", "arrow")
+
+
+# ---------- subcommand handlers (heavy imports stay inside) ----------
+
+def cmd_scan(args) -> None:
+    window = (args.path, args.start_date, args.start_hh, args.end_date, args.end_hh)
+    if args.engine == "python":
+        import Week1Analysis
+        Week1Analysis.analyze(*window)
+    elif args.engine == "pandas":
+        from Week2 import Week2PandasAnalysis
+        Week2PandasAnalysis.analyze(*window)
+    elif args.engine == "polars":
+        from Week2 import Week2PolarsAnalysis
+        Week2PolarsAnalysis.analyze(*window)
+    elif args.engine == "arrow":
+        from Week2 import Week2ArrowAnalysis
+        Week2ArrowAnalysis.analyze(*window)
+    else:
+        from Week2 import Week2DuckAnalysis
+        Week2DuckAnalysis.analyze(*window)
+
+
+def cmd_preprocess(args) -> None:
+    from Week3 import Preprocessing
+    Preprocessing.preprocess(args.input, args.out_events, args.out_lookup, tiers=not args.no_tiers)
+
+
+def cmd_bots(args) -> None:
+    from Week4 import Week4Analysis
+    Week4Analysis.detect_bot_like_users(
+        events_path=args.events,
+        fast_ratio_threshold=args.fast_ratio,
+        min_total_events=args.min_events,
+        percentile_for_fast=args.fast_percentile,
+        output_csv=args.out,
+    )
+
+
+def cmd_bursts(args) -> None:
+    from Week4 import Week4Analysis
+    Week4Analysis.detect_coordinated_bursts(
+        events_path=args.events,
+        time_granularity_sec=args.window_sec,
+        percentile_threshold=args.percentile,
+        output_csv=args.out,
+        index_path=args.index,
+    )
+
+
+def cmd_drill(args) -> None:
+    from Week4 import BurstIndex
+    BurstIndex.main(args.forward)
+
+
+def cmd_features(args) -> None:
+    from Week5 import BuildUserFeatures
+    BuildUserFeatures.build_user_features(args.events, args.out)
+
+
+def cmd_cluster(args) -> None:
+    from Week5 import Week5Analysis
+    Week5Analysis.cluster_users(args.features, args.out, k=args.k)
+
+
+def cmd_bench(args) -> None:
+    """Run the timeframe scan on each engine --runs times in this process and report wall time."""
+    import contextlib
+    import io
+    import statistics
+
+    print(f"{'engine':<8} {'min_ms':>10} {'median_ms':>10} {'max_ms':>10}")
+    for engine in args.engines:
+        scan_args = argparse.Namespace(**{**vars(args), "engine": engine})
+        times = []
+        for _ in range(args.runs):
+            t0 = time.perf_counter_ns()
+            with contextlib.redirect_stdout(io.StringIO()):
+                cmd_scan(scan_args)
+            times.append((time.perf_counter_ns() - t0) / 1_000_000)
+        print(f"{engine:<8} {min(times):>10.2f} {statistics.median(times):>10.2f} {max(times):>10.2f}")
+
+
+def cmd_run(args) -> None:
+    from rplace import pipeline
+    pipeline.main(args.forward)
+
+
+def cmd_synth(args) -> None:
+    from rplace import synth
+    synth.main(args.forward)
+
+
+def cmd_scale(args) -> None:
+    from rplace import scalebench
+    scalebench.main(args.forward)
+
+
+def cmd_serve(args) -> None:
+    from rplace import server
+    server.main(args.forward)
+
+
+def cmd_tiers(args) -> None:
+    from Week3 import SampleTiers
+    SampleTiers.write_sample_tiers(args.events, args.manifest or SampleTiers.default_manifest(args.events))
+
+
+def cmd_approx(args) -> None:
+    from rplace import approx
+    approx.main(args.forward)
+
+
+# ---------- argument parsing ----------
+
+# subcommands that hand everything after their name to the module's own argparse CLI
+FORWARDING = {"run", "synth", "scale", "serve", "approx", "drill"}
+# global options that take a value (so the value is not mistaken for a subcommand)
+GLOBAL_VALUE_OPTIONS = {"--repeat", "--trace"}
+
+def add_window_args(p: argparse.ArgumentParser) -> None:
+    p.add_argument("path", help="csv.gzip for --engine python, Parquet otherwise")
+    p.add_argument("start_date", help="YYYY-MM-DD")
+    p.add_argument("start_hh", help="HH")
+    p.add_argument("end_date", help="YYYY-MM-DD")
+    p.add_argument("end_hh", help="HH")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python3 -m rplace", description="r/place analysis toolkit")
+    parser.add_argument("--repeat", type=int, default=1, metavar="N",
+                        help="run the subcommand N times in this process (warm timings)")
+    parser.add_argument("--batch", action="store_true",
+                        help="read one subcommand per line from stdin and run them all in this process")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="append per-stage JSONL records to FILE (\"-\" = stderr); same as RPLACE_TRACE")
+    parser.add_argument("--profile", action="store_true",
+                        help="also record Polars operator timings / DuckDB plans; same as RPLACE_PROFILE=1")
+    sub = parser.add_subparsers(dest="command", metavar="<subcommand>")
+
+    p = sub.add_parser("scan", help="most placed color and pixel in a timeframe (Week1/Week2)")
+    add_window_args(p)
+    p.add_argument("--engine", choices=SCAN_ENGINES, default="polars")
+    p.set_defaults(func=cmd_scan)
+
+    p = sub.add_parser("preprocess", help="raw csv.gzip -> compact events Parquet (Week3)")
+    p.add_argument("input")
+    p.add_argument("out_events")
+    p.add_argument("out_lookup", nargs="?")
+    p.add_argument("--no-tiers", action="store_true", help="skip the 0.1%%/1%%/10%% sample tiers (see tiers)")
+    p.set_defaults(func=cmd_preprocess)
+
+    p = sub.add_parser("bots", help="flag bot-like users by inter-event timing (Week4 bucket 1)")
+    p.add_argument("events")
+    p.add_argument("--out", default="suspected_bots.csv")
+    p.add_argument("--fast-ratio", type=float, default=0.8)
+    p.add_argument("--min-events", type=int, default=50)
+    p.add_argument("--fast-percentile", type=float, default=0.01)
+    p.set_defaults(func=cmd_bots)
+
+    p = sub.add_parser("bursts", help="flag coordinated one-second bursts (Week4 bucket 2)")
+    p.add_argument("events")
+    p.add_argument("--out", default="coordinated_windows.csv")
+    p.add_argument("--window-sec", type=int, default=1)
+    p.add_argument("--percentile", type=float, default=0.99)
+    p.add_argument("--index", help="also write a drill-down index (e.g. burst_index.json; see Week4/BurstIndex.py)")
+    p.set_defaults(func=cmd_bursts)
+
+    p = sub.add_parser("drill", help="users, pixels and bot overlap of flagged burst windows (Week4 bucket 2)")
+    p.set_defaults(func=cmd_drill)
+
+    p = sub.add_parser("features", help="per-user feature table (Week5)")
+    p.add_argument("events")
+    p.add_argument("out")
+    p.set_defaults(func=cmd_features)
+
+    p = sub.add_parser("cluster", help="KMeans over user features (Week5)")
+    p.add_argument("features")
+    p.add_argument("out")
+    p.add_argument("--k", type=int, default=4)
+    p.set_defaults(func=cmd_cluster)
+
+    p = sub.add_parser("bench", help="time the timeframe scan across engines")
+    add_window_args(p)
+    p.add_argument("--engines", nargs="+", choices=SCAN_ENGINES, default=["pandas", "polars", "duckdb", "arrow"])
+    p.add_argument("--runs", type=int, default=3)
+    p.set_defaults(func=cmd_bench)
+
+    p = sub.add_parser("run", help="cached DAG run of the whole chain (see rplace.pipeline)")
+    p.set_defaults(func=cmd_run)
+
+    p = sub.add_parser("synth", help="synthetic events at any scale (see rplace.synth)")
+    p.set_defaults(func=cmd_synth)
+
+    p = sub.add_parser("scale", help="scaling benchmark of Week3-Week5 on synthetic data (see rplace.scalebench)")
+    p.set_defaults(func=cmd_scale)
+
+    p = sub.add_parser("serve", help="warm HTTP query server over events_compact.parquet (see rplace.server)")
+    p.set_defaults(func=cmd_serve)
+
+    p = sub.add_parser("tiers", help="nested 0.1%%/1%%/10%% user-sample tiers of the compact events (Week3)")
+    p.add_argument("events")
+    p.add_argument("manifest", nargs="?", help="default: <events stem>.tiers.json next to events")
+    p.set_defaults(func=cmd_tiers)
+
+    p = sub.add_parser("approx", help="approximate Week3/Week4 answers with error bounds (see rplace.approx)")
+    p.set_defaults(func=cmd_approx)
+
+    return parser
+
+
+def split_forwarded(argv: list[str]) -> tuple[list[str], list[str]]:
+    """
+    Split argv after a forwarding subcommand's name. argparse.REMAINDER can't be
+    used for this: in a subparser it does not capture a list starting with an
+    option (python3 -m rplace scale --scales 1M).
+    """
+    i = 0
+    while i < len(argv):
+        if argv[i] in GLOBAL_VALUE_OPTIONS:
+            i += 2
+            continue
+        if not argv[i].startswith("-"):
+            if argv[i] in FORWARDING:
+                return argv[:i + 1], argv[i + 1:]
+            break
+        i += 1
+    return argv, []
+
+
+def dispatch(parser: argparse.ArgumentParser, argv: list[str], in_batch: bool = False) -> int:
+    """
+    Parse and run one invocation. Returns a process-style exit code instead of exiting.
+    In a batch, any exception is reported and turned into exit code 1 so later lines still run.
+    """
+    # --trace / --profile apply to this invocation only (a batch line must not leak them into the next)
+    saved_env = {k: os.environ.get(k) for k in ("RPLACE_TRACE", "RPLACE_PROFILE")}
+    try:
+        own, forward = split_forwarded(argv)
+        args = parser.parse_args(own)
+        args.forward = forward
+        if args.trace:
+            os.environ["RPLACE_TRACE"] = args.trace
+        if args.profile:
+            os.environ["RPLACE_PROFILE"] = "1"
+        if args.batch:
+            return run_batch(parser, sys.stdin)
+        if args.command is None:
+            parser.print_help()
+            return 1
+        for _ in range(args.repeat):
+            args.func(args)
+    except SystemExit as e:
+        # argparse errors and the scripts' own sys.exit(1) must not end a batch
+        return e.code if isinstance(e.code, int) else 1
+    except Exception as e:
+        if not in_batch:
+            raise
+        print(f"Error: {type(e).__name__}: {e}", file=sys.stderr)
+        return 1
+    finally:
+        for k, v in saved_env.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+    return 0
+
+
+def run_batch(parser: argparse.ArgumentParser, lines) -> int:
+    failures = 0
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        print(f"\n>>> {line}")
+        t0 = time.perf_counter_ns()
+        rc = dispatch(parser, shlex.split(line), in_batch=True)
+        ms = (time.perf_counter_ns() - t0) / 1_000_000
+        print(f"<<< exit={rc} ({ms:.2f} ms)")
+        failures += rc != 0
+    return 1 if failures else 0
+
+
+def main(argv: list[str] | None = None) -> None:
+    sys.exit(dispatch(build_parser(), sys.argv[1:] if argv is None else argv))
+
+
+if __name__ == "__main__":
+    main()
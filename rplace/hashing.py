@@ -0,0 +1,22 @@
+"""
+Stable 64-bit hashing for user keys, identical across runs, machines and library
+versions (unlike pl.Expr.hash / Python's hash()).
+"""
+import numpy as np
+
+# user sample buckets are parts per million, so tiers down to 0.0001% are expressible
+BUCKETS = 1_000_000
+
+
+def mix64(x: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer: a bijection on uint64 that spreads consecutive keys uniformly."""
+    x = np.asarray(x).astype(np.uint64)
+    with np.errstate(over="ignore"):
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def user_bucket(user_keys: np.ndarray) -> np.ndarray:
+    """Bucket in [0, BUCKETS) per user key; a fraction-f sample keeps bucket < f * BUCKETS."""
+    return (mix64(user_keys) % np.uint64(BUCKETS)).astype(np.uint32)
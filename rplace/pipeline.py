@@ -0,0 +1,377 @@
+"""
+Content-hash-cached DAG runner for the Week3 -> Week4 -> Week5 chain.
+
+Every stage declares its input files, output files and parameters. Before a
+stage runs, its fingerprint is computed from:
+  - the content hash of each input file
+  - the stage parameters
+  - the source of the script that implements it, the helper modules it
+    declares and SHARED_MODULES
+A stage is skipped when its fingerprint matches the last successful run and
+its outputs are still the files that run produced. Because downstream stages
+hash the *contents* of their inputs, a rerun upstream that writes identical
+output does not invalidate anything further down.
+
+Stages whose inputs are ready run concurrently (e.g. bots, bursts and
+features all only need events_compact.parquet). With --jobs > 1 each line a
+stage prints is prefixed with its name, so concurrent output stays readable.
+
+Usage (from the repo root):
+    python3 -m rplace.pipeline <input.csv.gzip | events_compact.parquet> [--workdir DIR]
+        [--jobs N] [--set stage.param=value ...] [--force]
+"""
+import argparse
+import hashlib
+import importlib
+import importlib.util
+import io
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from threading import Lock
+from typing import Any
+
+STATE_FILE = ".pipeline_state.json"
+HASH_CHUNK_BYTES = 1 << 20
+# imported by every stage script; a change here (e.g. what collect() does) reruns everything
+SHARED_MODULES = ["rplace.profiling"]
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    One node of the DAG.
+    target is "module:function"; the function is called as
+    function(**inputs, **outputs, **params) with plain string paths.
+    If it returns a list of paths (files written next to its outputs), those
+    are hashed and checked like the declared outputs.
+    modules are helper modules whose source also goes into the fingerprint
+    (SHARED_MODULES are always added).
+    """
+    name: str
+    target: str
+    inputs: dict[str, str]
+    outputs: dict[str, str]
+    params: dict[str, Any] = field(default_factory=dict)
+    modules: list[str] = field(default_factory=list)
+
+
+def build_stages(source: str, workdir: str) -> list[Stage]:
+    """
+    Declare the r/place chain. source is either the raw canvas-history
+    csv.gzip (runs the Week3 preprocessing stages too) or an existing
+    events_compact.parquet (starts from Week4/Week5).
+    """
+    work = Path(workdir)
+    stages = []
+
+    if source.endswith(".parquet"):
+        events = source
+    else:
+        converted = str(work / "events_converted.parquet")
+        lookup = str(work / "user_lookup.parquet")
+        events = str(work / "events_compact.parquet")
+        stages += [
+            Stage(
+                name="convert",
+                target="Week3.Preprocessing:write_converted",
+                inputs={"inp": source},
+                outputs={"out": converted},
+            ),
+            Stage(
+                name="user_lookup",
+                target="Week3.BuildUserLookup:build_user_lookup",
+                inputs={"inp": converted},
+                outputs={"out": lookup},
+            ),
+            Stage(
+                name="compact",
+                target="Week3.FinalCompactEvents:compact_events",
+                inputs={"events_path": converted, "users_path": lookup},
+                outputs={"out_path": events},
+            ),
+        ]
+
+    features = str(work / "user_features.parquet")
+    stages += [
+        Stage(
+            name="bots",
+            target="Week4.Week4Analysis:detect_bot_like_users",
+            inputs={"events_path": events},
+            outputs={"output_csv": str(work / "suspected_bots.csv")},
+            params={"fast_ratio_threshold": 0.8, "min_total_events": 50, "percentile_for_fast": 0.01},
+        ),
+        Stage(
+            name="bursts",
+            target="Week4.Week4Analysis:detect_coordinated_bursts",
+            inputs={"events_path": events},
+            outputs={"output_csv": str(work / "coordinated_windows.csv"), "index_path": str(work / "burst_index.json")},
+            params={"time_granularity_sec": 1, "percentile_threshold": 0.99},
+            modules=["Week4.BurstIndex"],
+        ),
+        Stage(
+            name="tiers",
+            target="Week3.SampleTiers:write_sample_tiers",
+            inputs={"events_path": events},
+            outputs={"manifest_path": str(work / "events_compact.tiers.json")},
+            params={"fractions": [0.001, 0.01, 0.1]},
+            modules=["rplace.hashing"],
+        ),
+        Stage(
+            name="features",
+            target="Week5.BuildUserFeatures:build_user_features",
+            inputs={"events_path": events},
+            outputs={"out_path": features},
+        ),
+        Stage(
+            name="cluster",
+            target="Week5.Week5Analysis:cluster_users",
+            inputs={"features_path": features},
+            outputs={"out_path": str(work / "user_clusters.parquet")},
+            params={"k": 4},
+        ),
+    ]
+    return stages
+
+
+def apply_overrides(stages: list[Stage], overrides: list[str]) -> list[Stage]:
+    """
+    Apply "stage.param=value" overrides. Values are parsed as JSON when
+    possible (0.7, 10, true) and kept as strings otherwise.
+    """
+    by_name = {s.name: s for s in stages}
+    for item in overrides:
+        key, sep, raw = item.partition("=")
+        name, dot, param = key.partition(".")
+        if not sep or not dot or name not in by_name:
+            raise ValueError(f"bad override {item!r} (expected stage.param=value)")
+        stage = by_name[name]
+        if param not in stage.params:
+            raise ValueError(f"stage {name!r} has no parameter {param!r}")
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            value = raw
+        by_name[name] = replace(stage, params={**stage.params, param: value})
+    return [by_name[s.name] for s in stages]
+
+
+def resolve_target(target: str):
+    module_name, _, func_name = target.partition(":")
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+class PrefixedStdout(io.TextIOBase):
+    """
+    sys.stdout replacement for concurrent stages: while a thread is inside
+    stage_output(name), each complete line it prints goes out as "[name] line"
+    in one write, so lines from different stages never interleave mid-line.
+    Other threads write straight through.
+    """
+
+    def __init__(self, target):
+        self.target = target
+        self.local = threading.local()
+        self.lock = Lock()
+
+    def write(self, text: str) -> int:
+        name = getattr(self.local, "name", None)
+        if name is None:
+            with self.lock:
+                return self.target.write(text)
+        *lines, self.local.partial = (self.local.partial + text).split("\n")
+        if lines:
+            with self.lock:
+                self.target.write("".join(f"[{name}] {line}\n" for line in lines))
+        return len(text)
+
+    def flush(self) -> None:
+        with self.lock:
+            self.target.flush()
+
+    def begin(self, name: str) -> None:
+        self.local.name, self.local.partial = name, ""
+
+    def end(self) -> None:
+        if self.local.partial:
+            self.write("\n")
+        self.local.name = None
+
+
+class Runner:
+    def __init__(self, stages: list[Stage], workdir: str, jobs: int = 4, force: bool = False):
+        self.stages = stages
+        self.workdir = Path(workdir)
+        self.jobs = jobs
+        self.force = force
+        self.state_path = self.workdir / STATE_FILE
+        self.lock = Lock()
+        self.state = {"files": {}, "stages": {}}
+        if self.state_path.exists():
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                self.state = json.load(f)
+
+        # stage name -> names of the stages producing its inputs
+        producers = {path: s.name for s in stages for path in s.outputs.values()}
+        self.deps = {
+            s.name: {producers[p] for p in s.inputs.values() if p in producers}
+            for s in stages
+        }
+
+    # ---------- hashing ----------
+
+    def file_hash(self, path: str) -> str:
+        """
+        Content hash of a file. Hashes are cached by (size, mtime_ns) so an
+        unchanged multi-GB Parquet file is only read once.
+        """
+        key = os.path.abspath(path)
+        st = os.stat(key)
+        with self.lock:
+            cached = self.state["files"].get(key)
+        if cached and cached["size"] == st.st_size and cached["mtime_ns"] == st.st_mtime_ns:
+            return cached["hash"]
+
+        h = hashlib.blake2b(digest_size=20)
+        with open(key, "rb") as f:
+            while chunk := f.read(HASH_CHUNK_BYTES):
+                h.update(chunk)
+        digest = h.hexdigest()
+
+        with self.lock:
+            self.state["files"][key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "hash": digest}
+        return digest
+
+    def fingerprint(self, stage: Stage) -> str:
+        module_names = [stage.target.partition(":")[0], *stage.modules, *SHARED_MODULES]
+        code = [self.file_hash(importlib.util.find_spec(name).origin) for name in module_names]
+        payload = {
+            "target": stage.target,
+            "code": code,
+            "params": stage.params,
+            "inputs": {k: self.file_hash(p) for k, p in sorted(stage.inputs.items())},
+        }
+        return hashlib.blake2b(json.dumps(payload, sort_keys=True).encode(), digest_size=20).hexdigest()
+
+    def is_fresh(self, stage: Stage, fp: str) -> bool:
+        with self.lock:
+            record = self.state["stages"].get(stage.name)
+        if self.force or record is None or record["fingerprint"] != fp:
+            return False
+        for path in {*stage.outputs.values(), *record["outputs"]}:
+            if not os.path.exists(path) or self.file_hash(path) != record["outputs"].get(path):
+                return False
+        return True
+
+    def save_state(self) -> None:
+        tmp = self.state_path.with_suffix(".tmp")
+        with self.lock:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.state, f, indent=2, sort_keys=True)
+            os.replace(tmp, self.state_path)
+
+    # ---------- execution ----------
+
+    def run_stage(self, stage: Stage) -> bool:
+        """Run one stage if stale. Returns True if it actually ran."""
+        missing = [p for p in stage.inputs.values() if not os.path.exists(p)]
+        if missing:
+            raise FileNotFoundError(f"stage {stage.name}: missing input(s) {missing}")
+
+        fp = self.fingerprint(stage)
+        if self.is_fresh(stage, fp):
+            print(f"[pipeline] {stage.name}: up to date, skipped")
+            return False
+
+        print(f"[pipeline] {stage.name}: running {stage.target}")
+        t0 = time.perf_counter_ns()
+        func = resolve_target(stage.target)
+        out = sys.stdout if isinstance(sys.stdout, PrefixedStdout) else None
+        if out:
+            out.begin(stage.name)
+        try:
+            written = func(**stage.inputs, **stage.outputs, **stage.params) or []
+        finally:
+            if out:
+                out.end()
+        ms = (time.perf_counter_ns() - t0) / 1_000_000
+
+        outputs = {p: self.file_hash(p) for p in [*stage.outputs.values(), *map(str, written)]}
+        with self.lock:
+            self.state["stages"][stage.name] = {"fingerprint": fp, "outputs": outputs, "params": stage.params}
+        self.save_state()
+        print(f"[pipeline] {stage.name}: done in {ms:.2f} ms")
+        return True
+
+    def run(self) -> list[str]:
+        """Run the DAG, returning the names of the stages that were recomputed."""
+        self.workdir.mkdir(parents=True, exist_ok=True)
+        pending = {s.name: s for s in self.stages}
+        done = set()
+        ran = []
+
+        real_stdout = sys.stdout
+        if self.jobs > 1:
+            sys.stdout = PrefixedStdout(real_stdout)
+        try:
+            self._run_all(pending, done, ran)
+        finally:
+            sys.stdout = real_stdout
+
+        self.save_state()
+        return ran
+
+    def _run_all(self, pending: dict[str, Stage], done: set[str], ran: list[str]) -> None:
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            running = {}
+            while pending or running:
+                for name in [n for n in pending if self.deps[n] <= done]:
+                    running[pool.submit(self.run_stage, pending.pop(name))] = name
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    name = running.pop(fut)
+                    try:
+                        if fut.result():
+                            ran.append(name)
+                    except Exception:
+                        for other in running:
+                            other.cancel()
+                        raise
+                    done.add(name)
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(prog="python3 -m rplace.pipeline", description=__doc__.split("\n\n")[0])
+    parser.add_argument("source", help="raw canvas-history csv.gzip or an existing events_compact.parquet")
+    parser.add_argument("--workdir", default="pipeline_out", help="where intermediate and final outputs go")
+    parser.add_argument("--jobs", type=int, default=4, help="max stages running at once")
+    parser.add_argument("--set", dest="overrides", action="append", default=[], metavar="STAGE.PARAM=VALUE")
+    parser.add_argument("--force", action="store_true", help="ignore the cache and rerun every stage")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.source):
+        print(f"Error: input not found: {args.source}")
+        sys.exit(1)
+
+    try:
+        stages = apply_overrides(build_stages(args.source, args.workdir), args.overrides)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    t0 = time.perf_counter_ns()
+    ran = Runner(stages, args.workdir, jobs=args.jobs, force=args.force).run()
+    ms = (time.perf_counter_ns() - t0) / 1_000_000
+
+    print(f"\n[pipeline] Recomputed: {', '.join(ran) if ran else 'nothing (all stages up to date)'}")
+    print(f"[pipeline] Total Execution Time (ms): {ms:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+Per-stage instrumentation shared by every script.
+
+    from rplace.profiling import stage, collect
+
+    with stage("week3.task1", rows_in=n) as rec:
+        df = collect(lazy_frame, rec)   # lf.collect(), or lf.profile() when profiling
+        rec["rows_out"] = df.height
+    print(f"Task 1 Execution Time (ms): {rec['wall_ms']:.2f}")
+
+Each stage records wall time, CPU time (all threads, so Polars/DuckDB worker
+threads count), current and peak RSS, bytes read from storage, and any
+fields the caller sets (rows_in, rows_out, ...). Records are always filled
+in; they are only written out when tracing is on:
+
+    RPLACE_TRACE=run.jsonl   append one JSON object per stage to run.jsonl ("-" = stderr)
+    RPLACE_PROFILE=1         also capture Polars LazyFrame.profile() operator
+                             timings per stage (the optimized plan on Polars
+                             versions without profile()) and DuckDB EXPLAIN ANALYZE plans
+                             (as a separate "<stage>.explain" record)
+
+Compare two traces stage by stage:
+    python3 -m rplace.profiling diff before.jsonl after.jsonl
+
+Note: CPU, RSS and bytes-read are process-wide counters, so stages running
+concurrently in threads (rplace.pipeline --jobs > 1) see each other's work.
+"""
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+TRACE_ENV = "RPLACE_TRACE"
+PROFILE_ENV = "RPLACE_PROFILE"
+RUN_ID_ENV = "RPLACE_RUN_ID"
+
+_emit_lock = threading.Lock()
+_run_id = os.environ.get(RUN_ID_ENV) or uuid.uuid4().hex[:8]
+
+
+def tracing_enabled() -> bool:
+    return bool(os.environ.get(TRACE_ENV))
+
+
+def profiling_enabled() -> bool:
+    return os.environ.get(PROFILE_ENV, "") not in ("", "0")
+
+
+def _peak_rss_mb() -> float | None:
+    # VmHWM starts over at exec; ru_maxrss carries the parent's peak into
+    # subprocesses (it survives fork + execve), so prefer /proc when it exists
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, KiB on Linux
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def _rss_mb() -> float | None:
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1 << 20)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _bytes_read() -> int | None:
+    """Bytes this process has read from storage so far (Linux /proc/self/io)."""
+    try:
+        with open("/proc/self/io", "r") as f:
+            for line in f:
+                if line.startswith("read_bytes:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def emit(record: dict) -> None:
+    target = os.environ.get(TRACE_ENV)
+    if not target:
+        return
+    line = json.dumps(record, sort_keys=True, default=str)
+    with _emit_lock:
+        if target == "-":
+            print(line, file=sys.stderr)
+        else:
+            with open(target, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+@contextmanager
+def stage(name: str, **fields):
+    """
+    Measure the enclosed block. Yields the record dict so the caller can add
+    fields (rows_out, ...); timings are filled in when the block exits.
+    """
+    rec = {"stage": name, "run_id": _run_id, "pid": os.getpid(), **fields}
+    io0 = _bytes_read()
+    cpu0 = time.process_time_ns()
+    t0 = time.perf_counter_ns()
+    rec["ok"] = False
+    try:
+        yield rec
+        rec["ok"] = True
+    finally:
+        rec["wall_ms"] = round((time.perf_counter_ns() - t0) / 1_000_000, 3)
+        rec["cpu_ms"] = round((time.process_time_ns() - cpu0) / 1_000_000, 3)
+        rec["rss_mb"] = _rss_mb()
+        rec["peak_rss_mb"] = _peak_rss_mb()
+        io1 = _bytes_read()
+        rec["bytes_read"] = io1 - io0 if io0 is not None and io1 is not None else None
+        rec["ts"] = round(time.time(), 3)
+        emit(rec)
+
+
+def traced(name: str):
+    """Decorator form of stage() for functions that don't report row counts."""
+    def wrap(func):
+        @functools.wraps(func)
+        def inner(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return inner
+    return wrap
+
+
+def collect(lf, rec: dict | None = None):
+    """
+    lf.collect(), or lf.profile() when RPLACE_PROFILE is set, in which case
+    each operator's (node, start_us, end_us) is appended to rec["operators"].
+    Polars builds without profile() (2.x) get the optimized plan in rec["plan"].
+    """
+    if rec is None or not profiling_enabled():
+        return lf.collect()
+    profile = getattr(lf, "profile", None)
+    if profile is None:
+        rec.setdefault("plan", []).append(lf.explain())
+        return lf.collect()
+    df, prof = profile()
+    rec.setdefault("operators", []).extend(
+        {"node": node, "start_us": start, "end_us": end, "us": end - start}
+        for node, start, end in prof.iter_rows()
+    )
+    return df
+
+
+def duckdb_profile(con, query: str, name: str) -> None:
+    """
+    When RPLACE_PROFILE is set, re-run query under EXPLAIN ANALYZE as its own
+    "<name>.explain" stage (so the timed stage is not slowed down) and keep
+    the plan text in that record.
+    """
+    if not profiling_enabled():
+        return
+    with stage(f"{name}.explain") as rec:
+        rows = con.execute(f"EXPLAIN ANALYZE {query}").fetchall()
+        rec["plan"] = "\n".join(str(r[-1]) for r in rows)
+
+
+# ---------- trace comparison ----------
+
+def load_trace(path: str) -> dict[str, list[dict]]:
+    by_stage: dict[str, list[dict]] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                rec = json.loads(line)
+                by_stage.setdefault(rec["stage"], []).append(rec)
+    return by_stage
+
+
+def diff_traces(before: str, after: str) -> None:
+    """Print per-stage median wall/CPU time and peak RSS for two traces, with the change."""
+    import statistics
+
+    a, b = load_trace(before), load_trace(after)
+
+    def med(recs, key):
+        vals = [r[key] for r in recs if r.get(key) is not None]
+        return statistics.median(vals) if vals else None
+
+    print(f"{'stage':<28} {'metric':<12} {'before':>12} {'after':>12} {'change':>9}")
+    for name in sorted(set(a) | set(b)):
+        for key in ("wall_ms", "cpu_ms", "peak_rss_mb", "rows_out"):
+            x, y = med(a.get(name, []), key), med(b.get(name, []), key)
+            if x is None and y is None:
+                continue
+            change = f"{(y - x) / x * 100:+.1f}%" if x and y is not None else ""
+            fx = f"{x:.2f}" if x is not None else "-"
+            fy = f"{y:.2f}" if y is not None else "-"
+            print(f"{name:<28} {key:<12} {fx:>12} {fy:>12} {change:>9}")
+
+
+def main():
+    if len(sys.argv) != 4 or sys.argv[1] != "diff":
+        print("Usage: python3 -m rplace.profiling diff <before.jsonl> <after.jsonl>")
+        sys.exit(1)
+    diff_traces(sys.argv[2], sys.argv[3])
+
+
+if __name__ == "__main__":
+    main()
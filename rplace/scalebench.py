@@ -0,0 +1,158 @@
+"""
+Scaling benchmark: run the Week3-Week5 stages on synthetic data of several sizes.
+
+For every scale factor, rplace.synth writes place.csv.gzip and
+events_compact.parquet into <workdir>/<rows>/, then each stage runs in its own
+subprocess with RPLACE_TRACE set, and its rplace.profiling record (wall time,
+CPU time, peak RSS) is collected. A fresh process per stage keeps peak RSS
+honest: it is that stage's own high-water mark, not an earlier stage's.
+
+Stages:
+    preprocess  Week3/Preprocessing.py on the CSV (csv.gzip -> compact events)
+    analysis    Week3/Week3Analysis.py tasks 1-4
+    bots        Week4 bucket 1 (bot-like users)
+    bursts      Week4 bucket 2 (coordinated bursts)
+    features    Week5/BuildUserFeatures.py
+    cluster     Week5/Week5Analysis.py (KMeans)
+
+The report lists throughput (rows/s) and peak RSS per stage and scale, plus the
+log-log slope of time and memory against rows across all scales (1.0 = linear).
+
+Usage (from the repo root):
+    python3 -m rplace.scalebench --scales 100k 1M 10M [--stages bots bursts] [--csv scaling.csv]
+"""
+import argparse
+import csv
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from rplace import REPO_ROOT
+from rplace.profiling import TRACE_ENV
+from rplace.synth import SynthConfig, generate, parse_count
+
+STAGES = ("preprocess", "analysis", "bots", "bursts", "features", "cluster")
+
+
+def stage_command(name: str, d: Path) -> tuple[list[str], str]:
+    """(argv, trace stage name) for one benchmark stage in scale directory d."""
+    # the stage runs with cwd=REPO_ROOT, so every path it gets must be absolute
+    d = Path(os.path.abspath(d))
+    py = [sys.executable, "-m", "rplace"]
+    csv_path, events = str(d / "place.csv.gzip"), str(d / "events_compact.parquet")
+    features = str(d / "user_features.parquet")
+    return {
+        "preprocess": (py + ["preprocess", "--no-tiers", csv_path, str(d / "preprocessed.parquet")], "week3.preprocess"),
+        "analysis": ([sys.executable, "-m", "Week3.Week3Analysis", events], "week3.total"),
+        "bots": (py + ["bots", events, "--out", str(d / "suspected_bots.csv")], "week4.bots"),
+        "bursts": (py + ["bursts", events, "--out", str(d / "coordinated_windows.csv")], "week4.bursts"),
+        "features": (py + ["features", events, features], "week5.features"),
+        "cluster": (py + ["cluster", features, str(d / "user_clusters.parquet")], "week5.cluster"),
+    }[name]
+
+
+def run_stage(name: str, d: Path) -> dict:
+    argv, trace_stage = stage_command(name, d)
+    trace = Path(os.path.abspath(d / f"{name}.trace.jsonl"))
+    trace.unlink(missing_ok=True)
+    subprocess.run(argv, cwd=REPO_ROOT, env={**os.environ, TRACE_ENV: str(trace)},
+                   stdout=subprocess.DEVNULL, check=True)
+    with open(trace, "r", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return next(r for r in records if r["stage"] == trace_stage)
+
+
+def run_scale(rows: int, workdir: Path, stages: list[str], seed: int) -> list[dict]:
+    d = workdir / str(rows)
+    d.mkdir(parents=True, exist_ok=True)
+    results = []
+
+    cfg = SynthConfig(rows=rows, seed=seed)
+    needs_csv = "preprocess" in stages
+    if not (d / "events_compact.parquet").exists() or (needs_csv and not (d / "place.csv.gzip").exists()):
+        t0 = time.perf_counter_ns()
+        generate(cfg, csv_path=str(d / "place.csv.gzip") if needs_csv else None,
+                 compact_path=str(d / "events_compact.parquet"))
+        results.append({"stage": "generate", "wall_ms": (time.perf_counter_ns() - t0) / 1_000_000})
+
+    if "cluster" in stages and "features" not in stages and not (d / "user_features.parquet").exists():
+        run_stage("features", d)
+
+    for name in stages:
+        rec = run_stage(name, d)
+        results.append({"stage": name, "wall_ms": rec["wall_ms"], "cpu_ms": rec["cpu_ms"],
+                        "peak_rss_mb": rec["peak_rss_mb"]})
+        print(f"  {rows:>12,} {name:<11} {rec['wall_ms']:>12.2f} ms  peak {rec['peak_rss_mb'] or 0:>8.1f} MB")
+
+    for r in results:
+        r["rows"] = rows
+        r["rows_per_sec"] = rows / (r["wall_ms"] / 1000) if r["wall_ms"] else None
+    return results
+
+
+def slope(xs: list[float], ys: list[float]) -> float | None:
+    """Least-squares slope of log(y) on log(x); None with fewer than two usable points."""
+    pts = [(x, y) for x, y in zip(xs, ys) if x and y]
+    if len(pts) < 2:
+        return None
+    lx, ly = np.log([p[0] for p in pts]), np.log([p[1] for p in pts])
+    return float(np.polyfit(lx, ly, 1)[0])
+
+
+def report(results: list[dict]) -> None:
+    print(f"\n{'stage':<11} {'rows':>12} {'wall_ms':>12} {'rows/s':>14} {'peak_rss_mb':>12}")
+    for r in results:
+        rss = f"{r['peak_rss_mb']:.1f}" if r.get("peak_rss_mb") is not None else "-"
+        print(f"{r['stage']:<11} {r['rows']:>12,} {r['wall_ms']:>12.2f} {r['rows_per_sec'] or 0:>14,.0f} {rss:>12}")
+
+    print(f"\n{'stage':<11} {'time_slope':>10} {'rss_slope':>10}   (log-log vs rows; 1.0 = linear)")
+    for name in dict.fromkeys(r["stage"] for r in results):
+        rs = [r for r in results if r["stage"] == name]
+        t = slope([r["rows"] for r in rs], [r["wall_ms"] for r in rs])
+        m = slope([r["rows"] for r in rs], [r.get("peak_rss_mb") for r in rs])
+        print(f"{name:<11} {t if t is not None else float('nan'):>10.2f} {m if m is not None else float('nan'):>10.2f}")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python3 -m rplace.scalebench", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scales", type=parse_count, nargs="+", default=[100_000, 1_000_000],
+                        help="row counts, e.g. 100k 1M 10M 100M")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--workdir", default="scalebench_out", help="generated data is reused across runs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--csv", help="write every (scale, stage) measurement to this CSV")
+    parser.add_argument("--clean", action="store_true", help="delete the generated data when done")
+    args = parser.parse_args(argv)
+
+    workdir = Path(os.path.abspath(args.workdir))
+    results = []
+    try:
+        for rows in sorted(args.scales):
+            results += run_scale(rows, workdir, args.stages, args.seed)
+    except subprocess.CalledProcessError as e:
+        print(f"Error: stage failed: {' '.join(e.cmd)}")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    report(results)
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=["rows", "stage", "wall_ms", "cpu_ms", "rows_per_sec", "peak_rss_mb"])
+            writer.writeheader()
+            for r in results:
+                writer.writerow({k: r.get(k) for k in writer.fieldnames})
+        print(f"Wrote {args.csv}")
+    if args.clean:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""
+Warm local query server for timeframe analytics on events_compact.parquet.
+
+Every Week3/Week4 script run re-opens the Parquet file, decodes the columns and
+rebuilds its hash tables before answering one window. The server pays that once:
+  - the compact events are read into memory once and kept sorted by t_ms, so a
+    window is two binary searches and a zero-copy slice instead of a filter
+  - each user's first placement time is computed once and kept sorted, so
+    "first-time users in a window" is two binary searches
+  - answers go through a bounded LRU cache keyed by (query, window, params);
+    concurrent requests for the same uncomputed key wait for one computation
+    instead of all running it
+  - the HTTP server is threaded and Polars releases the GIL while executing, so
+    clients asking different questions run in parallel
+
+Queries (GET, JSON out; start_ms/end_ms are t_ms offsets, default 01:00-07:00 like Week3):
+    /top_colors?start_ms=&end_ms=&limit=10     colors by distinct users (Week3 task 1)
+    /top_pixel?start_ms=&end_ms=               most placed color and pixel (Week1/Week2 question)
+    /session_length?start_ms=&end_ms=          average session length (Week3 task 2)
+    /percentiles?start_ms=&end_ms=             pixels-per-user percentiles (Week3 task 3)
+    /first_time_users?start_ms=&end_ms=        users whose first pixel is in the window (Week3 task 4)
+    /bots?start_ms=&end_ms=&fast_ratio=0.8&min_events=50&fast_percentile=0.01
+                                               bot-like users within the window (Week4 bucket 1)
+    /stats                                     rows loaded, cache size / hits / misses
+
+Usage (from the repo root):
+    python3 -m rplace.server events_compact.parquet [--port 8765] [--cache-size 256]
+    curl 'http://127.0.0.1:8765/top_colors?start_ms=3600000&end_ms=25200000'
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+import polars as pl
+
+from rplace.profiling import stage
+from Week3 import Week3Analysis
+from Week4 import Week4Analysis
+
+DEFAULT_START_MS = 1 * 60 * 60 * 1000
+DEFAULT_END_MS = 7 * 60 * 60 * 1000
+
+
+class EventStore:
+    """events_compact.parquet held in memory, sorted by t_ms."""
+
+    def __init__(self, path: str):
+        with stage("server.load") as rec:
+            events = pl.read_parquet(path, columns=["t_ms", "user_key", "color_id", "x", "y"])
+            if not events["t_ms"].is_sorted():
+                events = events.sort("t_ms")
+            self.events = events.rechunk()
+            self.t_ms = self.events["t_ms"].to_numpy()
+            self.first_seen = np.sort(
+                self.events.group_by("user_key").agg(pl.col("t_ms").min())["t_ms"].to_numpy()
+            )
+            rec["rows_out"] = self.events.height
+        self.load_ms = rec["wall_ms"]
+
+    def window(self, start_ms: int, end_ms: int) -> pl.LazyFrame:
+        lo = int(np.searchsorted(self.t_ms, start_ms, side="left"))
+        hi = int(np.searchsorted(self.t_ms, end_ms, side="left"))
+        return self.events.slice(lo, max(0, hi - lo)).lazy()
+
+    def first_time_users(self, start_ms: int, end_ms: int) -> int:
+        lo, hi = np.searchsorted(self.first_seen, [start_ms, end_ms], side="left")
+        return int(hi - lo)
+
+
+class ResultCache:
+    """Bounded LRU of query results; one computation per key even under concurrent requests."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: OrderedDict = OrderedDict()
+        self.in_flight: dict = {}
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get_or_compute(self, key, compute):
+        """Returns (value, cached)."""
+        while True:
+            with self.lock:
+                if key in self.entries:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return self.entries[key], True
+                waiter = self.in_flight.get(key)
+                if waiter is None:
+                    done = self.in_flight[key] = threading.Event()
+                    self.misses += 1
+                    break
+            waiter.wait()   # someone else is computing it; then re-check the cache
+
+        try:
+            value = compute()
+            with self.lock:
+                self.entries[key] = value
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+            return value, False
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+            done.set()
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"entries": len(self.entries), "max_entries": self.max_entries,
+                    "hits": self.hits, "misses": self.misses}
+
+
+# ---------- queries: (store, params) -> JSON-able result ----------
+
+def q_top_colors(store: EventStore, p: dict):
+    df = Week3Analysis.top_colors(store.window(p["start_ms"], p["end_ms"]), limit=p["limit"])
+    return df.to_dicts()
+
+
+def q_top_pixel(store: EventStore, p: dict):
+    w = store.window(p["start_ms"], p["end_ms"])
+    color = w.group_by("color_id").len().sort("len", descending=True).limit(1).collect()
+    pixel = w.group_by(["x", "y"]).len().sort("len", descending=True).limit(1).collect()
+    if color.height == 0:
+        return None
+    color_id = color["color_id"][0]
+    return {
+        "color": Week3Analysis.COLOR_ID_TO_NAME.get(color_id, f"Unknown({color_id})"),
+        "color_count": color["len"][0],
+        "pixel": [pixel["x"][0], pixel["y"][0]],
+        "pixel_count": pixel["len"][0],
+    }
+
+
+def q_session_length(store: EventStore, p: dict):
+    return {"avg_session_length_ms": Week3Analysis.avg_session_length(store.window(p["start_ms"], p["end_ms"]))}
+
+
+def q_percentiles(store: EventStore, p: dict):
+    pct = Week3Analysis.pixel_percentiles(store.window(p["start_ms"], p["end_ms"]))
+    return {f"p{k}": v for k, v in pct.items()}
+
+
+def q_first_time_users(store: EventStore, p: dict):
+    return {"first_time_users": store.first_time_users(p["start_ms"], p["end_ms"])}
+
+
+def q_bots(store: EventStore, p: dict):
+    windows = Week4Analysis.inter_event_windows(store.window(p["start_ms"], p["end_ms"]))
+    threshold = Week4Analysis.fast_threshold(windows, p["fast_percentile"])
+    if threshold is None:   # no user has two events in the window
+        return {"fast_threshold_ms": None, "count": 0, "users": []}
+    bots = Week4Analysis.bot_like_users(windows, threshold, p["fast_ratio"], p["min_events"]).collect()
+    return {"fast_threshold_ms": threshold, "count": bots.height, "users": bots.to_dicts()}
+
+
+WINDOW_PARAMS = {"start_ms": (int, DEFAULT_START_MS), "end_ms": (int, DEFAULT_END_MS)}
+
+# name -> (function, {param: (type, default)})
+QUERIES = {
+    "top_colors": (q_top_colors, {**WINDOW_PARAMS, "limit": (int, 10)}),
+    "top_pixel": (q_top_pixel, WINDOW_PARAMS),
+    "session_length": (q_session_length, WINDOW_PARAMS),
+    "percentiles": (q_percentiles, WINDOW_PARAMS),
+    "first_time_users": (q_first_time_users, WINDOW_PARAMS),
+    "bots": (q_bots, {**WINDOW_PARAMS, "fast_ratio": (float, 0.8), "min_events": (int, 50),
+                      "fast_percentile": (float, 0.01)}),
+}
+
+
+def parse_params(spec: dict, raw: dict) -> dict:
+    """Fill defaults and convert types, so equivalent requests share one cache key."""
+    unknown = set(raw) - set(spec)
+    if unknown:
+        raise ValueError(f"unknown parameter(s): {', '.join(sorted(unknown))}")
+    params = {}
+    for name, (typ, default) in spec.items():
+        try:
+            params[name] = typ(raw[name]) if name in raw else default
+        except ValueError:
+            raise ValueError(f"{name} must be {typ.__name__}, got {raw[name]!r}") from None
+    if "start_ms" in params and params["start_ms"] >= params["end_ms"]:
+        raise ValueError("start_ms must be less than end_ms")
+    return params
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    store: EventStore = None
+    cache: ResultCache = None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        name = url.path.strip("/")
+        if name == "stats":
+            return self.send_json(200, {"rows": self.store.events.height, "load_ms": self.store.load_ms,
+                                        "cache": self.cache.stats()})
+        if name not in QUERIES:
+            return self.send_json(404, {"error": f"unknown query {name!r}", "queries": sorted(QUERIES)})
+
+        func, spec = QUERIES[name]
+        try:
+            params = parse_params(spec, dict(parse_qsl(url.query)))
+        except ValueError as e:
+            return self.send_json(400, {"error": str(e)})
+
+        t0 = time.perf_counter_ns()
+        key = (name, tuple(sorted(params.items())))
+        try:
+            result, cached = self.cache.get_or_compute(key, lambda: func(self.store, params))
+        except Exception as e:
+            return self.send_json(500, {"error": f"{type(e).__name__}: {e}", "query": name, "params": params})
+        ms = (time.perf_counter_ns() - t0) / 1_000_000
+        self.send_json(200, {"query": name, "params": params, "result": result, "cached": cached, "ms": round(ms, 3)})
+
+    def send_json(self, status: int, body: dict) -> None:
+        data = json.dumps(body, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, fmt, *args):
+        if not self.server.quiet:
+            super().log_message(fmt, *args)
+
+
+def make_server(store: EventStore, host: str, port: int, cache_size: int, quiet: bool = False) -> ThreadingHTTPServer:
+    handler = type("Handler", (QueryHandler,), {"store": store, "cache": ResultCache(cache_size)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.quiet = quiet
+    return server
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python3 -m rplace.server", description=__doc__.split("\n\n")[0])
+    parser.add_argument("events", help="events_compact.parquet")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--cache-size", type=int, default=256, help="max cached results (LRU)")
+    parser.add_argument("--quiet", action="store_true", help="no per-request log lines")
+    args = parser.parse_args(argv)
+
+    if not Path(args.events).exists():
+        print(f"Error: {args.events} not found")
+        sys.exit(1)
+
+    store = EventStore(args.events)
+    print(f"Loaded {store.events.height:,} events ({store.load_ms:.2f} ms)")
+    server = make_server(store, args.host, args.port, args.cache_size, args.quiet)
+    print(f"Serving on http://{args.host}:{server.server_address[1]}/ ({', '.join(sorted(QUERIES))}, stats)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
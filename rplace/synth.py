@@ -0,0 +1,345 @@
+"""
+Synthetic r/place 2022 events at any scale, for CI, laptops and scaling runs.
+
+The generator imitates the parts of the real dump that the Week3-Week5 code is
+sensitive to:
+  - heavy-tailed activity: user keys are drawn as floor(users * u**ACTIVITY_ALPHA),
+    so a few users place most pixels and most users place a handful, then
+    scrambled with a bijection so activity does not follow key order
+  - bursty time profile: per-second intensity = daily cycle x opening ramp x
+    a lognormal factor per minute; event times are drawn from its CDF
+  - the canvas grows 1000x1000 -> 2000x1000 -> 2000x2000 at the real expansion
+    times; most placements land on Gaussian "art" hotspots, the rest anywhere
+  - the 32-color 2022 palette with skewed color frequencies
+  - injected bot-like users (one pixel every ~0.3-1.5 s for a long stretch) and
+    coordinated bursts (many distinct users, one small box, one color, one second)
+
+Output is produced in time-ordered chunks of chunk_rows, each from its own
+child of one np.random.SeedSequence, so a given (rows, seed, chunk_rows) always
+yields the same files and memory stays flat up to 1B rows. Any of:
+  --csv          raw dump schema: timestamp,user_id,pixel_color,coordinate (gzip)
+  --raw-parquet  the same four string columns as Parquet (Week2 input)
+  --compact      events_compact schema: t_ms i32, user_key u32, color_id u8, x u16, y u16
+
+t_ms is relative to the first event, like Preprocessing.py; user_key and
+color_id are the generator's own numbering (Preprocessing.py assigns keys by
+sorted user_id, so its compact file has the same events under other keys).
+
+Usage (from the repo root):
+    python3 -m rplace.synth 10M --csv place.csv.gzip --compact events_compact.parquet [--seed 0]
+"""
+import argparse
+import datetime
+import gzip
+import sys
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+from rplace.hashing import mix64
+from rplace.profiling import stage
+
+# the 2022 canvas ran 2022-04-01 12:44:10 UTC to 2022-04-05 00:14:00 UTC
+START_MS = 1648817050000
+DURATION_SEC = 301_790
+# (seconds after start, width, height): the two canvas expansions
+CANVAS_SIZES = ((0, 1000, 1000), (99_000, 2000, 1000), (195_000, 2000, 2000))
+
+PALETTE = (
+    "#6D001A", "#BE0039", "#FF4500", "#FFA800", "#FFD635", "#FFF8B8", "#00A368", "#00CC78",
+    "#7EED56", "#00756F", "#009EAA", "#00CCC0", "#2450A4", "#3690EA", "#51E9F4", "#493AC1",
+    "#6A5CFF", "#94B3FF", "#811E9F", "#B44AC0", "#E4ABFF", "#DE107F", "#FF3881", "#FF99AA",
+    "#6D482F", "#9C6926", "#FFB470", "#000000", "#515252", "#898D90", "#D4D7D9", "#FFFFFF",
+)
+
+ACTIVITY_ALPHA = 2.5     # larger = more skewed; top 1% of users place ~16% of pixels
+EVENTS_PER_USER = 16     # rough mean of the real dump (~160M events / ~10M users)
+HOTSPOT_SHARE = 0.75     # placements that land on a hotspot instead of anywhere
+BOT_SHARE = 0.005        # fraction of rows placed by injected bots (well under the 1% Week4 calls fast)
+
+COMPACT_SCHEMA = pa.schema([
+    ("t_ms", pa.int32()), ("user_key", pa.uint32()), ("color_id", pa.uint8()),
+    ("x", pa.uint16()), ("y", pa.uint16()),
+])
+RAW_SCHEMA = pa.schema([
+    ("timestamp", pa.string()), ("user_id", pa.string()),
+    ("pixel_color", pa.string()), ("coordinate", pa.string()),
+])
+
+
+@dataclass
+class SynthConfig:
+    rows: int
+    seed: int = 0
+    users: int | None = None      # default rows // EVENTS_PER_USER
+    bots: int | None = None       # default users // 5000 (at least 3)
+    bursts: int = 24
+    hotspots: int = 400
+    chunk_rows: int = 2_000_000
+
+    def __post_init__(self):
+        if self.rows < 1000:
+            raise ValueError(f"rows must be at least 1000, got {self.rows}")
+        if self.users is None:
+            self.users = max(100, self.rows // EVENTS_PER_USER)
+        if self.bots is None:
+            self.bots = max(3, self.users // 5000)
+
+
+def parse_count(value: str) -> int:
+    """'250k', '10M', '1B' or '1e6' -> int."""
+    v = value.strip().upper()
+    mult = {"K": 10**3, "M": 10**6, "B": 10**9}.get(v[-1:], 1)
+    if mult != 1:
+        v = v[:-1]
+    try:
+        return int(float(v) * mult)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a row count: {value!r}") from None
+
+
+class EventGenerator:
+    """Precomputes the time profile, hotspots, bots and bursts; chunks() yields compact tables."""
+
+    def __init__(self, cfg: SynthConfig):
+        self.cfg = cfg
+        root = np.random.SeedSequence(cfg.seed)
+        world_seed, self.chunk_seed = root.spawn(2)
+        rng = np.random.default_rng(world_seed)
+
+        # time profile
+        sec = np.arange(DURATION_SEC)
+        daily = 1.0 + 0.6 * np.sin(2 * np.pi * (sec / 86_400 - 0.35))
+        ramp = np.minimum(1.0, 0.1 + sec / 7200)
+        per_minute = rng.lognormal(0.0, 0.5, size=DURATION_SEC // 60 + 1)[sec // 60]
+        intensity = daily * ramp * per_minute
+        self.cdf = np.cumsum(intensity) / intensity.sum()
+
+        # user keys: normal users are [0, users), bots follow; a*k+b mod n scrambles them
+        self.n_keys = cfg.users + cfg.bots
+        self.key_mul = self._coprime(rng, self.n_keys)
+        self.key_add = int(rng.integers(self.n_keys))
+
+        # hotspots: centre, spread, dominant color
+        self.hot_xy = rng.uniform(0, 2000, size=(cfg.hotspots, 2))
+        self.hot_sigma = rng.uniform(3, 40, size=cfg.hotspots)
+        self.hot_color = rng.integers(0, len(PALETTE), size=cfg.hotspots)
+        color_w = 1.0 / np.arange(1, len(PALETTE) + 1) ** 0.8
+        self.color_cdf = np.cumsum(rng.permutation(color_w)) / color_w.sum()
+
+        # bots: start, interval and number of placements
+        per_bot = max(60, int(cfg.rows * BOT_SHARE / cfg.bots))
+        self.bot_interval = rng.uniform(300, 1500, size=cfg.bots)
+        span = per_bot * self.bot_interval
+        self.bot_start = rng.uniform(0, np.maximum(DURATION_SEC * 1000 - span, 1))
+        self.bot_count = np.full(cfg.bots, per_bot)
+
+        # bursts: one second each, well above the usual distinct users per second
+        per_burst = max(50, int(5 * cfg.rows / DURATION_SEC))
+        self.burst_sec = np.sort(rng.choice(DURATION_SEC, size=cfg.bursts, replace=False))
+        self.burst_users = per_burst
+        self.burst_xy = rng.uniform(0, 1000, size=(cfg.bursts, 2))
+        self.burst_color = rng.integers(0, len(PALETTE), size=cfg.bursts)
+
+        injected = int(self.bot_count.sum()) + cfg.bursts * per_burst
+        self.normal_rows = max(0, cfg.rows - injected)
+        self.n_chunks = max(1, -(-cfg.rows // cfg.chunk_rows))
+
+        # chunk k covers CDF quantiles [k/C, (k+1)/C), so chunks are time-ordered
+        q = np.arange(self.n_chunks + 1) / self.n_chunks
+        bounds = np.searchsorted(self.cdf, q[1:-1], side="right") * 1000
+        self.bounds_ms = np.r_[0, bounds, DURATION_SEC * 1000].astype(np.int64)
+
+    @staticmethod
+    def _coprime(rng, n: int) -> int:
+        while True:
+            a = int(rng.integers(n // 3 + 1, n)) | 1
+            if np.gcd(a, n) == 1:
+                return a
+
+    def _scramble(self, keys: np.ndarray) -> np.ndarray:
+        return ((keys.astype(np.int64) * self.key_mul + self.key_add) % self.n_keys).astype(np.uint32)
+
+    def _place(self, rng, owners: np.ndarray, t_ms: np.ndarray):
+        """x, y and color for placements by owners (pre-scramble keys) at t_ms."""
+        n = len(owners)
+        # each user sticks to "their" hotspot
+        spot = (mix64(owners) % np.uint64(self.cfg.hotspots)).astype(np.int64)
+        on_spot = rng.random(n) < HOTSPOT_SHARE
+        xy = np.where(
+            on_spot[:, None],
+            self.hot_xy[spot] + rng.standard_normal((n, 2)) * self.hot_sigma[spot, None],
+            rng.uniform(0, 2000, size=(n, 2)),
+        )
+        color = np.searchsorted(self.color_cdf, rng.random(n), side="right")
+        color = np.where(on_spot & (rng.random(n) < 0.5), self.hot_color[spot], color)
+        return self._clip(xy, t_ms), color.astype(np.uint8)
+
+    @staticmethod
+    def _clip(xy: np.ndarray, t_ms: np.ndarray):
+        width = np.full(len(t_ms), CANVAS_SIZES[0][1])
+        height = np.full(len(t_ms), CANVAS_SIZES[0][2])
+        for at_sec, w, h in CANVAS_SIZES[1:]:
+            later = t_ms >= at_sec * 1000
+            width[later], height[later] = w, h
+        x = np.abs(xy[:, 0]).astype(np.int64) % width
+        y = np.abs(xy[:, 1]).astype(np.int64) % height
+        return x.astype(np.uint16), y.astype(np.uint16)
+
+    def _normal(self, rng, k: int, n: int):
+        lo, hi = k / self.n_chunks, (k + 1) / self.n_chunks
+        sec = np.searchsorted(self.cdf, rng.uniform(lo, hi, size=n), side="right")
+        t_ms = np.clip(sec * 1000 + rng.integers(0, 1000, size=n), self.bounds_ms[k], self.bounds_ms[k + 1] - 1)
+        owners = (self.cfg.users * rng.random(n) ** ACTIVITY_ALPHA).astype(np.int64)
+        (x, y), color = self._place(rng, owners, t_ms)
+        return t_ms, owners, color, x, y
+
+    def _bots(self, rng, lo_ms: int, hi_ms: int):
+        first = np.maximum(0, np.ceil((lo_ms - self.bot_start) / self.bot_interval)).astype(np.int64)
+        last = np.minimum(self.bot_count, np.ceil((hi_ms - self.bot_start) / self.bot_interval)).astype(np.int64)
+        n = np.maximum(0, last - first)
+        bot = np.repeat(np.arange(self.cfg.bots), n)
+        step = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n) + np.repeat(first, n)
+        jitter = rng.uniform(-0.1, 0.1, size=len(bot)) * self.bot_interval[bot]
+        t_ms = np.clip(self.bot_start[bot] + step * self.bot_interval[bot] + jitter, lo_ms, hi_ms - 1).astype(np.int64)
+        owners = self.cfg.users + bot
+        (x, y), color = self._place(rng, owners, t_ms)
+        return t_ms, owners, color, x, y
+
+    def _bursts(self, rng, lo_ms: int, hi_ms: int):
+        idx = np.flatnonzero((self.burst_sec * 1000 >= lo_ms) & (self.burst_sec * 1000 < hi_ms))
+        m = self.burst_users
+        b = np.repeat(idx, m)
+        t_ms = np.minimum(self.burst_sec[b] * 1000 + rng.integers(0, 1000, size=len(b)), hi_ms - 1)
+        owners = np.concatenate([rng.choice(self.cfg.users, size=min(m, self.cfg.users), replace=False) for _ in idx]
+                                or [np.empty(0, np.int64)])
+        owners = np.resize(owners, len(b))
+        xy = self.burst_xy[b] + rng.uniform(0, 20, size=(len(b), 2))
+        x, y = self._clip(xy, t_ms)
+        return t_ms, owners, self.burst_color[b].astype(np.uint8), x, y
+
+    def chunks(self):
+        """Yield time-sorted compact tables (COMPACT_SCHEMA), about chunk_rows each."""
+        seeds = self.chunk_seed.spawn(self.n_chunks)
+        per_chunk = np.diff(np.linspace(0, self.normal_rows, self.n_chunks + 1).astype(np.int64))
+        for k in range(self.n_chunks):
+            rng = np.random.default_rng(seeds[k])
+            lo_ms, hi_ms = int(self.bounds_ms[k]), int(self.bounds_ms[k + 1])
+            parts = [self._normal(rng, k, int(per_chunk[k])), self._bots(rng, lo_ms, hi_ms),
+                     self._bursts(rng, lo_ms, hi_ms)]
+            t_ms, owners, color, x, y = (np.concatenate(cols) for cols in zip(*parts))
+
+            order = np.argsort(t_ms, kind="stable")
+            t_ms = t_ms[order]
+            if k == 0 and len(t_ms):
+                t_ms[0] = 0   # t_ms is an offset from the first event
+            yield pa.Table.from_arrays(
+                [pa.array(t_ms.astype(np.int32)), pa.array(self._scramble(owners[order])),
+                 pa.array(color[order]), pa.array(x[order]), pa.array(y[order])],
+                schema=COMPACT_SCHEMA,
+            )
+
+
+def _zero_pad(values: np.ndarray, width: int) -> pa.Array:
+    return pc.utf8_lpad(pc.cast(pa.array(values), pa.string()), width, "0")
+
+
+def format_timestamps(epoch_ms: np.ndarray) -> pa.Array:
+    """'2022-04-04 01:13:22.582 UTC' strings; ~5x faster than pc.strftime on this range."""
+    day, rem = np.divmod(epoch_ms, 86_400_000)
+    first = int(day.min())
+    dates = pa.array([
+        (datetime.date(1970, 1, 1) + datetime.timedelta(days=d)).isoformat()
+        for d in range(first, int(day.max()) + 1)
+    ])
+    return pc.binary_join_element_wise(
+        pc.take(dates, pa.array(day - first)), " ",
+        _zero_pad(rem // 3_600_000, 2), ":", _zero_pad(rem // 60_000 % 60, 2), ":",
+        _zero_pad(rem // 1000 % 60, 2), ".", _zero_pad(rem % 1000, 3), " UTC",
+        "",
+    )
+
+
+def to_raw(table: pa.Table) -> pa.Table:
+    """Compact chunk -> raw dump columns (all strings, like the 2022 CSV)."""
+    ts = format_timestamps(table["t_ms"].to_numpy().astype(np.int64) + START_MS)
+    uid = pa.array(mix64(table["user_key"].to_numpy()))
+    user_id = pc.binary_join_element_wise("u", pc.cast(uid, pa.string()), "")
+    palette = pa.array(PALETTE)
+    color = pc.take(palette, table["color_id"])
+    coord = pc.binary_join_element_wise(pc.cast(table["x"], pa.string()), pc.cast(table["y"], pa.string()), ",")
+    return pa.Table.from_arrays([ts, user_id, color, coord], schema=RAW_SCHEMA)
+
+
+def generate(cfg: SynthConfig, csv_path: str | None = None, compact_path: str | None = None,
+             raw_parquet_path: str | None = None) -> int:
+    """Write the requested outputs chunk by chunk. Returns the number of rows written."""
+    gen = EventGenerator(cfg)
+    rows = 0
+    csv_sink = csv_writer = compact_writer = raw_writer = None
+    try:
+        if csv_path:
+            # Arrow's gzip stream is fixed at level 9, which takes ~90% of the run
+            csv_sink = gzip.open(csv_path, "wb", compresslevel=1)
+            csv_writer = pacsv.CSVWriter(csv_sink, RAW_SCHEMA)
+        if compact_path:
+            compact_writer = pq.ParquetWriter(compact_path, COMPACT_SCHEMA, compression="zstd")
+        if raw_parquet_path:
+            raw_writer = pq.ParquetWriter(raw_parquet_path, RAW_SCHEMA, compression="zstd")
+
+        with stage("synth.generate", rows_in=cfg.rows, seed=cfg.seed) as rec:
+            for chunk in gen.chunks():
+                if compact_writer:
+                    compact_writer.write_table(chunk)
+                if csv_writer or raw_writer:
+                    raw = to_raw(chunk)
+                    if csv_writer:
+                        csv_writer.write_table(raw)
+                    if raw_writer:
+                        raw_writer.write_table(raw)
+                rows += chunk.num_rows
+            rec["rows_out"] = rows
+    finally:
+        for w in (csv_writer, csv_sink, compact_writer, raw_writer):
+            if w is not None:
+                w.close()
+    return rows
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python3 -m rplace.synth", description=__doc__.split("\n\n")[0])
+    parser.add_argument("rows", type=parse_count, help="approximate row count, e.g. 1M, 250k, 1B")
+    parser.add_argument("--csv", help="raw dump schema, gzip CSV (Week1 / Preprocessing.py input)")
+    parser.add_argument("--raw-parquet", help="raw dump schema as Parquet (Week2 input)")
+    parser.add_argument("--compact", help="events_compact schema (Week3-Week5 input)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--users", type=parse_count, help=f"user key space (default rows/{EVENTS_PER_USER})")
+    parser.add_argument("--bots", type=int, help="injected bot-like users (default users/5000, min 3)")
+    parser.add_argument("--bursts", type=int, default=24, help="injected coordinated bursts")
+    parser.add_argument("--chunk-rows", type=parse_count, default=2_000_000)
+    args = parser.parse_args(argv)
+
+    if not (args.csv or args.raw_parquet or args.compact):
+        print("Error: give at least one of --csv, --raw-parquet, --compact")
+        sys.exit(1)
+    try:
+        cfg = SynthConfig(rows=args.rows, seed=args.seed, users=args.users, bots=args.bots,
+                          bursts=args.bursts, chunk_rows=args.chunk_rows)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    t0 = time.perf_counter_ns()
+    rows = generate(cfg, args.csv, args.compact, args.raw_parquet)
+    ms = (time.perf_counter_ns() - t0) / 1_000_000
+    print(f"Generated {rows:,} events (users<={cfg.users:,}, bots={cfg.bots}, bursts={cfg.bursts})")
+    print(f"Execution Time (ms): {ms:.2f}")
+
+
+if __name__ == "__main__":
+    main()